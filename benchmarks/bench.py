@@ -0,0 +1,220 @@
+"""Benchmarks for the discovery, parsing, visiting and export stages.
+
+Synthetic trees are generated in a temporary directory, so the suite runs offline:
+
+    uv run python benchmarks/bench.py --scale 1 --output bench.json
+    uv run python benchmarks/bench.py --compare bench.json
+"""
+
+import argparse
+import collections
+import json
+import pathlib
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import asyntree
+from asyntree import api
+from asyntree.visitor import Visitor
+
+SCENARIOS: Dict[str, Callable[[pathlib.Path, int], Dict[str, Any]]] = {}
+
+
+def scenario(func: Callable[[pathlib.Path, int], Dict[str, Any]]):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def python_source(rng: random.Random, n_functions: int) -> str:
+    modules = ["os", "sys", "json", "numpy", "requests", "yaml", "collections", "typing"]
+    lines = [f"import {name}" for name in rng.sample(modules, 3)]
+    lines.append("from pathlib import Path\n")
+
+    for i in range(n_functions):
+        lines.append(f"def function_{i}(a, b=1, *args, **kwargs):")
+        lines.append(f'    """Docstring for function {i}."""')
+        lines.append("    total = 0")
+        lines.append("    for x in range(a):")
+        lines.append("        if x % 2 == 0 and b:")
+        lines.append("            total += x * b - len(args)")
+        lines.append("        else:")
+        lines.append("            total -= kwargs.get('k', [1, 2, 3])[0]")
+        lines.append(f"    return {{'value': total, 'name': 'function_{i}'}}\n")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_files(root: pathlib.Path, relative_paths: List[str], content: str) -> None:
+    for relative in relative_paths:
+        file_path = root / relative
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+
+@scenario
+def deep_wide(root: pathlib.Path, scale: int) -> Dict[str, Any]:
+    """Nested packages (depth 4, fanout 3) with a handful of modules each."""
+    content = python_source(random.Random(1), 10)
+    paths = []
+    for i in range(scale):
+        dirs = [f"pkg{i}"]
+        for _ in range(4):
+            dirs = [f"{d}/sub{j}" for d in dirs for j in range(3)]
+        paths.extend(f"{d}/module{k}.py" for d in dirs for k in range(3))
+    write_files(root, paths, content)
+    return {"incl_ext": [".py"], "excl_dir": None}
+
+
+@scenario
+def many_small(root: pathlib.Path, scale: int) -> Dict[str, Any]:
+    """Thousands of tiny modules in a flat layout."""
+    content = python_source(random.Random(2), 1)
+    paths = [f"dir{i // 200}/small{i}.py" for i in range(2000 * scale)]
+    write_files(root, paths, content)
+    return {"incl_ext": [".py"], "excl_dir": None}
+
+
+@scenario
+def few_huge(root: pathlib.Path, scale: int) -> Dict[str, Any]:
+    """A few multi-megabyte generated modules."""
+    content = python_source(random.Random(3), 1500 * scale)
+    write_files(root, [f"generated{i}.py" for i in range(4)], content)
+    return {"incl_ext": [".py"], "excl_dir": None}
+
+
+@scenario
+def excluded_subtrees(root: pathlib.Path, scale: int) -> Dict[str, Any]:
+    """A small project next to large .venv and node_modules trees that are excluded."""
+    content = python_source(random.Random(4), 5)
+    write_files(root, [f"src/app/module{i}.py" for i in range(50)], content)
+    write_files(
+        root, [f".venv/lib/site-packages/dep{i // 50}/m{i}.py" for i in range(3000 * scale)], ""
+    )
+    write_files(root, [f"node_modules/dep{i // 50}/index{i}.js" for i in range(3000 * scale)], "")
+    return {"incl_ext": [".py"], "excl_dir": [".venv", "node_modules"]}
+
+
+def stages(root: pathlib.Path, filters: Dict[str, Any], output_dir: pathlib.Path):
+    file_paths = api.parse_directory(root, **filters)
+    trees = [api.parse_ast(p) for p in file_paths]
+
+    return {
+        "parse_directory": lambda: api.parse_directory(root, **filters),
+        "iter_directory": lambda: sum(1 for _ in api.iter_directory(root, **filters)),
+        "parse_ast": lambda: collections.deque(map(api.parse_ast, file_paths), maxlen=0),
+        "Visitor.run": lambda: [Visitor().run(t) for t in trees],
+        "describe": lambda: api.describe(root, **filters),
+        "analyze": lambda: api.analyze(root, **filters),
+        "to_tree": lambda: api.to_tree(root, **filters),
+        "to_llm": lambda: api.to_llm(root, **filters, output_file=str(output_dir / "llm.txt")),
+        "to_requirements": lambda: api.to_requirements(
+            root, **filters, output_file=str(output_dir / "requirements.txt")
+        ),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run(names: List[str], scale: int, repeat: int) -> List[Dict[str, Any]]:
+    results = []
+
+    for name in names:
+        with tempfile.TemporaryDirectory(prefix="asyntree-bench-") as tmp:
+            root = pathlib.Path(tmp) / name
+            output_dir = pathlib.Path(tmp) / "output"
+            output_dir.mkdir()
+            filters = SCENARIOS[name](root, scale)
+
+            file_paths = api.parse_directory(root, **filters)
+            n_files = len(file_paths)
+            n_bytes = sum(p.stat().st_size for p in file_paths)
+
+            for stage, func in stages(root, filters, output_dir).items():
+                timing = measure(func, repeat)
+                seconds = max(timing["seconds"], 1e-9)
+                results.append(
+                    {
+                        "scenario": name,
+                        "stage": stage,
+                        "files": n_files,
+                        "bytes": n_bytes,
+                        "seconds": timing["seconds"],
+                        "files_per_second": n_files / seconds,
+                        "mb_per_second": n_bytes / seconds / 1e6,
+                        "peak_memory_bytes": timing["peak_bytes"],
+                    }
+                )
+                print(_format_row(results[-1]), flush=True)
+
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: pathlib.Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    previous = {(r["scenario"], r["stage"]): r for r in baseline["results"]}
+
+    print(f"\nCompared to {baseline_path} (time ratio, <1 is faster):")
+    for r in results:
+        old = previous.get((r["scenario"], r["stage"]))
+        if old is None:
+            continue
+        ratio = r["seconds"] / max(old["seconds"], 1e-9)
+        print(f"{r['scenario']:<18} {r['stage']:<16} {ratio:6.2f}x")
+
+
+def _format_row(r: Dict[str, Any]) -> str:
+    return (
+        f"{r['scenario']:<18} {r['stage']:<16} {r['seconds'] * 1000:10.1f} ms "
+        f"{r['files_per_second']:12.0f} files/s {r['mb_per_second']:9.2f} MB/s "
+        f"{r['peak_memory_bytes'] / 1e6:9.2f} MB peak"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", "-s", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--scale", type=int, default=1, help="Size multiplier for the trees")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best kept)")
+    parser.add_argument("--output", "-o", type=pathlib.Path, help="Write results as JSON")
+    parser.add_argument("--compare", "-c", type=pathlib.Path, help="Previous JSON results")
+    args = parser.parse_args(argv)
+
+    results = run(args.scenario or list(SCENARIOS), args.scale, args.repeat)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        report = {
+            "asyntree_version": asyntree.__version__,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nSaved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,50 @@
 """asyntree"""
 
-import importlib.metadata
-
-from asyntree.api import (
-    describe,
-    parse_ast,
-    parse_directory,
-    to_llm,
-    to_requirements,
-    to_tree,
-)
+from typing import Any
 
 __title__ = "asyntree"
 __description__ = "Syntax trees and file utilities."
 
-try:
-    __version__ = importlib.metadata.version(__package__ or __title__)
-except importlib.metadata.PackageNotFoundError:
-    __version__ = "unknown"
-
 __all__ = [
+    "analyze",
     "describe",
+    "iter_describe",
     "to_llm",
     "to_requirements",
     "to_tree",
+    "iter_tree",
+    "watch_describe",
+    "watch_llm",
+    "watch_requirements",
     "parse_directory",
+    "iter_directory",
+    "iter_records",
     "parse_ast",
+    "profile",
     "__title__",
     "__description__",
     "__version__",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # The API and the package metadata are loaded on first use, which keeps `import asyntree`
+    # (and so every CLI invocation) fast.
+    if name == "__version__":
+        import importlib.metadata
+
+        try:
+            version = importlib.metadata.version(__package__ or __title__)
+        except importlib.metadata.PackageNotFoundError:
+            version = "unknown"
+        globals()["__version__"] = version
+        return version
+
+    if name in __all__:
+        from asyntree import api
+
+        value = getattr(api, name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
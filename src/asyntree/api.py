@@ -1,13 +1,96 @@
+import collections
+import contextlib
+import functools
+import itertools
+import os
 import pathlib
 import sys
-from typing import Any, Dict, List, Optional, Set
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from asyntree.imports import first_party_modules, scan_imports
+from asyntree.llm import BYTES_PER_TOKEN, CHUNK_SIZE, PREFETCH_BYTES, export_llm, is_export_file
+from asyntree.parser import (
+    FileRecord,
+    Fingerprint,
+    iter_directory,
+    iter_records,
+    parse_ast,  # noqa: F401 (part of the package's API)
+    parse_directory,  # noqa: F401 (part of the package's API)
+    parse_source,
+    read_source,
+)
+from asyntree.profiling import deactivate, profile, timed  # noqa: F401 (`profile` is part of the API)
+from asyntree.visitor import ImportVisitor, MultiVisitor, Visitor
+from asyntree.watch import POLL_INTERVAL, iter_changes
+
+if TYPE_CHECKING:
+    from rich.tree import Tree
+
+    from asyntree.cache import MemoryCache
+    from asyntree.distributions import DistributionIndex
+    from asyntree.tree import DirectoryNode
+
+# Modules that only some commands need (rich rendering, the process pool, SQLite and package
+# metadata) are imported where they are used, so that importing the API stays cheap.
+
+_CHUNK_SIZE = 32
+
+# A file to analyze: its path, or the record found while walking (with its size and mtime).
+_File = Union[pathlib.Path, FileRecord]
+
+# Analyses that can be requested per file: the visitor and how its result is stored/returned.
+_ANALYSES: Dict[str, Tuple[type, Callable[[Any], Any]]] = {
+    "ast": (Visitor, dict),
+    "imports": (ImportVisitor, sorted),
+}
+
+
+def analyze(
+    directory_path: pathlib.Path,
+    *,
+    analyses: Sequence[str] = ("ast", "imports"),
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    cache: Optional["MemoryCache"] = None,
+) -> List[Dict[str, Any]]:
+    """Run the requested analyses on all python files, parsing each file once.
 
-from rich.filesize import decimal
-from rich.text import Text
-from rich.tree import Tree
+    Results are looked up in `cache` (kept in memory by long-running processes), then in the
+    on-disk cache in `cache_dir`, before parsing.
+    """
 
-from asyntree.parser import parse_ast, parse_directory
-from asyntree.visitor import ImportVisitor, Visitor
+    unknown = set(analyses) - _ANALYSES.keys()
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(sorted(unknown))}")
+
+    files = _iter_files(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        stat=cache_dir is not None or cache is not None,
+    )
+    file_results = _analyze_files(
+        tuple(analyses), files, workers=workers, cache_dir=cache_dir, cache=cache
+    )
+
+    return [{"path": file_path.name, **results} for file_path, results in file_results]
 
 
 def describe(
@@ -15,20 +98,102 @@ def describe(
     *,
     incl_ext: Optional[List[str]] = None,
     excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    cache: Optional["MemoryCache"] = None,
 ) -> List[Dict[str, Any]]:
     """Print the ast nodes of all python files."""
 
-    visitor = Visitor()
-    output = []
-
-    file_paths = parse_directory(directory_path, incl_ext=incl_ext, excl_dir=excl_dir)
+    return list(
+        iter_describe(
+            directory_path,
+            incl_ext=incl_ext,
+            excl_dir=excl_dir,
+            use_gitignore=use_gitignore,
+            workers=workers,
+            cache_dir=cache_dir,
+            cache=cache,
+        )
+    )
 
-    for file_path in file_paths:
-        file_ast = parse_ast(file_path)
-        file_ast_metrics = dict(visitor.run(file_ast))
-        output.append({"path": file_path.name, "ast": file_ast_metrics})
 
-    return output
+def iter_describe(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    cache: Optional["MemoryCache"] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the ast nodes of each python file (as in `describe`) as soon as it is parsed."""
+
+    files = _iter_files(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        stat=cache_dir is not None or cache is not None,
+    )
+    file_results = _analyze_files(
+        ("ast",), files, workers=workers, cache_dir=cache_dir, cache=cache
+    )
+
+    for file_path, results in file_results:
+        yield {"path": file_path.name, "ast": results["ast"]}
+
+
+def watch_describe(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    polling: bool = False,
+    interval: float = POLL_INTERVAL,
+) -> Iterator[Dict[str, List[Any]]]:
+    """Describe all python files, then again each time some of them change.
+
+    Results are kept in memory, and only new or modified files are parsed again. Each update
+    has all the `results` (as returned by `describe`), the `changed` ones and the `removed`
+    paths. A file that can't be parsed (e.g. while it is being edited) has an `error` in place
+    of its `ast`. See `iter_changes` for `polling` and `interval`.
+    """
+
+    records: Dict[pathlib.Path, Dict[str, Any]] = {}
+
+    for changes in iter_changes(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        polling=polling,
+        interval=interval,
+    ):
+        for path in changes["removed"]:
+            del records[path]
+
+        changed = []
+        file_results = _analyze_files(
+            ("ast",),
+            changes["changed"],
+            workers=_watch_workers(workers, changes["changed"]),
+            cache_dir=cache_dir,
+            catch_errors=True,
+        )
+        for path, results in file_results:
+            records[path] = {"path": path.name, **results}
+            changed.append(records[path])
+
+        yield {
+            "results": [records[path] for path in changes["files"]],
+            "changed": changed,
+            "removed": [path.name for path in changes["removed"]],
+        }
 
 
 def to_tree(
@@ -36,40 +201,79 @@ def to_tree(
     *,
     incl_ext: Optional[List[str]] = None,
     excl_dir: Optional[List[str]] = None,
-) -> Tree:
-    """Print the tree structure of the directory."""
-
-    file_paths = parse_directory(directory_path, incl_ext=incl_ext, excl_dir=excl_dir)
-
-    if not file_paths:
+    use_gitignore: bool = False,
+    max_depth: Optional[int] = None,
+    max_entries_per_dir: Optional[int] = None,
+    summarize: bool = False,
+) -> "Tree":
+    """Print the tree structure of the directory.
+
+    Directories below `max_depth` levels, and the entries of a directory past the first
+    `max_entries_per_dir`, are collapsed into a node with their number of files and total size.
+    With `summarize`, only directories are shown, each with the files below it summed up.
+    """
+
+    root_node = _directory_tree(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        max_depth=max_depth,
+        max_entries_per_dir=max_entries_per_dir,
+    )
+    if root_node is None:
         return None
 
-    nodes: Dict[pathlib.Path, Tree] = {}
-
-    root_node = Tree(Text(directory_path.name))
-    nodes[directory_path] = root_node
-
-    for path in sorted(file_paths, key=lambda p: p.parts):
-        if path.name.startswith("."):
-            continue
-
-        relative_path = path.relative_to(directory_path)
-        current = root_node
-        current_parent = directory_path
+    from asyntree.tree import to_rich
 
-        for part in relative_path.parts[:-1]:
-            current_path = current_parent / part
-            if current_path not in nodes:
-                nodes[current_path] = current.add(Text(part, "yellow bold"))
-            current = nodes[current_path]
-            current_parent = current_path
+    with timed("render"):
+        return to_rich(
+            root_node,
+            max_depth=max_depth,
+            max_entries_per_dir=max_entries_per_dir,
+            summarize=summarize,
+        )
 
-        file_size = path.stat().st_size
-        text_filename = Text(path.name, "green")
-        text_filename.append(f" ({decimal(file_size)})", "blue")
-        current.add(text_filename)
 
-    return root_node
+def iter_tree(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    max_depth: Optional[int] = None,
+    max_entries_per_dir: Optional[int] = None,
+    summarize: bool = False,
+    ascii: bool = False,
+) -> Iterator[str]:
+    """Yield the lines of the tree structure of the directory (as in `to_tree`) as plain text.
+
+    Lines are drawn without Rich (with ASCII guides when `ascii`), and yielded as soon as the
+    files are found and sorted.
+    """
+
+    root_node = _directory_tree(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        max_depth=max_depth,
+        max_entries_per_dir=max_entries_per_dir,
+    )
+    if root_node is None:
+        return
+
+    from asyntree.tree import iter_lines
+
+    # Includes the time the caller takes to write each line out.
+    with timed("render"):
+        yield from iter_lines(
+            root_node,
+            max_depth=max_depth,
+            max_entries_per_dir=max_entries_per_dir,
+            summarize=summarize,
+            ascii=ascii,
+        )
 
 
 def to_llm(
@@ -77,85 +281,476 @@ def to_llm(
     *,
     incl_ext: Optional[List[str]] = None,
     excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
     output_file: str = "llm.txt",
+    chunk_size: Optional[int] = CHUNK_SIZE,
+    max_tokens: Optional[int] = None,
+    shard_size: Optional[int] = None,
+    shard_tokens: Optional[int] = None,
+    io_threads: int = 1,
+    prefetch_bytes: int = PREFETCH_BYTES,
+    incremental: bool = False,
+    skip_binary: bool = False,
+    max_file_size: Optional[int] = None,
+    dedupe: bool = False,
+    on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> pathlib.Path:
     """Generate (and export) the llm.txt file."""
 
-    file_paths = parse_directory(directory_path, incl_ext=incl_ext, excl_dir=excl_dir)
+    shard_size = _shard_size(shard_size, shard_tokens)
+    output_path = pathlib.Path(output_file)
+
+    # A previous export in the directory would otherwise be read while it is overwritten.
+    is_output = functools.partial(is_export_file, output_path.resolve())
+    records = sorted(
+        (
+            record
+            for record in iter_records(
+                directory_path, incl_ext=incl_ext, excl_dir=excl_dir, use_gitignore=use_gitignore
+            )
+            if not is_output(record.path)
+        ),
+        key=lambda record: record.path,
+    )
+
+    if not records:
+        return None
+
+    return export_llm(
+        [record.path for record in records],
+        directory_path.parent,
+        output_path,
+        chunk_size=chunk_size,
+        max_tokens=max_tokens,
+        shard_size=shard_size,
+        io_threads=io_threads,
+        prefetch_bytes=prefetch_bytes,
+        incremental=incremental,
+        skip_binary=skip_binary,
+        max_file_size=max_file_size,
+        dedupe=dedupe,
+        fingerprints=[record.fingerprint for record in records],
+        on_file=on_file,
+    )
+
+
+def watch_llm(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    output_file: str = "llm.txt",
+    polling: bool = False,
+    interval: float = POLL_INTERVAL,
+    **options: Any,
+) -> Iterator[Optional[pathlib.Path]]:
+    """Generate the llm.txt file, then update it each time the files change.
+
+    Takes the export options of `to_llm`, and yields what it returns after each update. Updates
+    are incremental (only changed files are read again, see `update_llm`) unless sharding or
+    deduplicating. The export's own files are never exported, even when written into the
+    directory. See `iter_changes` for `polling` and `interval`.
+    """
+
+    directory_path = pathlib.Path(directory_path).resolve()
+    output_path = pathlib.Path(output_file)
+    options["shard_size"] = _shard_size(
+        options.get("shard_size"), options.pop("shard_tokens", None)
+    )
+    options.setdefault("incremental", options["shard_size"] is None and not options.get("dedupe"))
+
+    for changes in iter_changes(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        ignore=functools.partial(is_export_file, output_path.resolve()),
+        polling=polling,
+        interval=interval,
+    ):
+        if not changes["files"]:
+            yield None
+            continue
+
+        yield export_llm(sorted(changes["files"]), directory_path.parent, output_path, **options)
 
-    if not file_paths:
+
+def to_requirements(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    cache: Optional["MemoryCache"] = None,
+    pin: bool = False,
+    output_file: str = "llm.txt",
+) -> pathlib.Path:
+    """Generate (and export) the requirements.txt file.
+
+    Imports provided by an installed distribution are written as that distribution's name
+    (e.g. `PyYAML` for `yaml`), pinned to the installed version with `pin`.
+    """
+
+    # Files are found by their resolved paths, which are made relative to the project's parent.
+    directory_path = pathlib.Path(directory_path).resolve()
+    files = _iter_files(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        stat=cache_dir is not None or cache is not None,
+    )
+
+    first_file = next(files, None)
+    if first_file is None:
         return None
 
-    file_paths = sorted(file_paths)
+    # The project's own modules are collected while the files stream through the extraction.
+    relative_paths = []
 
-    content_list = []
+    def record(files: Iterable[_File]) -> Iterator[_File]:
+        for file in files:
+            relative_paths.append(_file_path(file).relative_to(directory_path.parent))
+            yield file
 
-    content_list.append("<<<--- File Paths --->>>\n\n")
-    for file_path in file_paths:
-        relative_path = file_path.relative_to(directory_path.parent)
-        content_list.append(f"{relative_path}\n")
+    imports = _extract_imports(
+        record(itertools.chain([first_file], files)),
+        workers=workers,
+        cache_dir=cache_dir,
+        cache=cache,
+    )
+    first_party = first_party_modules(relative_paths)
 
-    content_list.append("\n<<<--- File Contents --->>>\n\n")
-    for file_path in file_paths:
-        relative_path = file_path.relative_to(directory_path.parent)
-        try:
-            with open(file_path, encoding="utf-8") as f:
-                file_content = f.read()
+    from asyntree.distributions import load_distribution_index
 
-            content_list.append(f'<file path="{relative_path}">\n')
-            content_list.append(file_content)
-            content_list.append("\n</file>\n\n")
-        except Exception as e:
-            content_list.append(f'<file path="{relative_path}">\n')
-            content_list.append(f"Could not read file: {e}\n")
-            content_list.append("</file>\n\n")
+    requirements = _requirements(imports, first_party, load_distribution_index(cache_dir), pin=pin)
 
     output_path = pathlib.Path(output_file)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.writelines(content_list)
+    _write_requirements(output_path, requirements)
 
     return output_path
 
 
-def to_requirements(
+def watch_requirements(
     directory_path: pathlib.Path,
     *,
     incl_ext: Optional[List[str]] = None,
     excl_dir: Optional[List[str]] = None,
-    output_file: str = "llm.txt",
-) -> pathlib.Path:
-    """Generate (and export) the requirements.txt file."""
+    use_gitignore: bool = False,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    pin: bool = False,
+    output_file: str = "requirements.txt",
+    polling: bool = False,
+    interval: float = POLL_INTERVAL,
+) -> Iterator[pathlib.Path]:
+    """Generate the requirements.txt file, then update it each time the requirements change.
+
+    The imports of each file are kept in memory, and only new or modified files are scanned
+    again. A file that can't be parsed (e.g. while it is being edited) keeps its previous
+    imports. Yields the output path each time it is written. See `iter_changes` for `polling`
+    and `interval`.
+    """
+
+    from asyntree.distributions import load_distribution_index
+
+    directory_path = pathlib.Path(directory_path).resolve()
+    distributions = load_distribution_index(cache_dir)
+    output_path = pathlib.Path(output_file)
+    resolved_output_path = output_path.resolve()
+
+    file_imports: Dict[pathlib.Path, List[str]] = {}
+    # How many files import each module, updated file by file.
+    import_counts: collections.Counter = collections.Counter()
+    first_party: Set[str] = set()
+    n_files = 0
+    written = None
+
+    for changes in iter_changes(
+        directory_path,
+        incl_ext=incl_ext,
+        excl_dir=excl_dir,
+        use_gitignore=use_gitignore,
+        ignore=lambda path: path == resolved_output_path,
+        polling=polling,
+        interval=interval,
+    ):
+        for path in changes["removed"]:
+            import_counts.subtract(file_imports.pop(path, ()))
+
+        file_results = _analyze_files(
+            ("imports",),
+            changes["changed"],
+            workers=_watch_workers(workers, changes["changed"]),
+            cache_dir=cache_dir,
+            catch_errors=True,
+        )
+        for path, results in file_results:
+            if "error" not in results:
+                import_counts.subtract(file_imports.get(path, ()))
+                import_counts.update(results["imports"])
+                file_imports[path] = results["imports"]
+
+        # The project's own modules only change when files are added or removed.
+        if changes["removed"] or len(changes["files"]) != n_files:
+            n_files = len(changes["files"])
+            first_party = first_party_modules(
+                path.relative_to(directory_path.parent) for path in changes["files"]
+            )
+
+        imports = {name for name, count in import_counts.items() if count > 0}
+        requirements = _requirements(imports, first_party, distributions, pin=pin)
+        if requirements != written:
+            _write_requirements(output_path, requirements)
+            written = requirements
+            yield output_path
+
+
+def _directory_tree(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]],
+    excl_dir: Optional[List[str]],
+    use_gitignore: bool,
+    max_depth: Optional[int],
+    max_entries_per_dir: Optional[int],
+) -> Optional["DirectoryNode"]:
+    # The files of the directory arranged into a tree, or None if there are none.
+    if max_depth is not None and max_depth < 0:
+        raise ValueError("max_depth must be at least 0")
+    if max_entries_per_dir is not None and max_entries_per_dir < 1:
+        raise ValueError("max_entries_per_dir must be at least 1")
+
+    records = iter_records(
+        directory_path, incl_ext=incl_ext, excl_dir=excl_dir, use_gitignore=use_gitignore
+    )
+
+    first_record = next(records, None)
+    if first_record is None:
+        return None
 
-    file_paths = parse_directory(directory_path, incl_ext=incl_ext, excl_dir=excl_dir)
+    from asyntree.tree import build_tree
 
-    if not file_paths:
-        return None
+    return build_tree(
+        directory_path.name,
+        str(pathlib.Path(directory_path).resolve()),
+        itertools.chain([first_record], records),
+    )
 
-    imports = _extract_imports(file_paths)
 
+def _requirements(
+    imports: Iterable[str],
+    first_party: Set[str],
+    distributions: "DistributionIndex",
+    *,
+    pin: bool,
+) -> List[str]:
     external_deps = []
     for dep in sorted(imports):
         if not dep.startswith(".") and dep not in sys.stdlib_module_names:
             root_module = dep.split(".")[0]
-            if root_module not in sys.stdlib_module_names:
+            if root_module not in sys.stdlib_module_names and root_module not in first_party:
                 external_deps.append(root_module)
 
     unique_deps = sorted(list(set(external_deps)))
 
-    output_path = pathlib.Path(output_file)
+    requirements = set()
+    for dep in unique_deps:
+        for name, version in distributions.get(dep) or [(dep, None)]:
+            requirements.add(f"{name}=={version}" if pin and version else name)
+
+    return sorted(requirements, key=str.lower)
+
+
+def _write_requirements(output_path: pathlib.Path, requirements: List[str]) -> None:
     with open(output_path, "w", encoding="utf-8") as f:
-        f.writelines(f"{dep}\n" for dep in unique_deps)
+        f.writelines(f"{requirement}\n" for requirement in requirements)
 
-    return output_path
+
+def _shard_size(shard_size: Optional[int], shard_tokens: Optional[int]) -> Optional[int]:
+    if shard_size is not None and shard_tokens is not None:
+        raise ValueError("Use either shard_size or shard_tokens, not both")
+    if shard_tokens is not None:
+        return shard_tokens * BYTES_PER_TOKEN
+    return shard_size
 
 
-def _extract_imports(paths: List[pathlib.Path]) -> Set[str]:
+def _extract_imports(
+    files: Iterable[_File],
+    *,
+    workers: int = 1,
+    cache_dir: Optional[pathlib.Path] = None,
+    cache: Optional["MemoryCache"] = None,
+) -> Set[str]:
     all_imports = set()
-    visitor = ImportVisitor()
 
-    for file_path in paths:
-        ast_tree = parse_ast(file_path)
-        imports = visitor.run(ast_tree)
-        all_imports.update(imports)
+    file_results = _analyze_files(
+        ("imports",), files, workers=workers, cache_dir=cache_dir, cache=cache
+    )
+    for _, results in file_results:
+        all_imports.update(results["imports"])
 
     return all_imports
+
+
+def _analyze_file(path: pathlib.Path, analyses: Tuple[str, ...]) -> Dict[str, Any]:
+    return _analyze_source(read_source(path), path, analyses)
+
+
+def _analyze_source(source: bytes, path: pathlib.Path, analyses: Tuple[str, ...]) -> Dict[str, Any]:
+    if analyses == ("imports",):
+        # Imports alone can usually be found without building the AST.
+        with timed("visit", path):
+            imports = scan_imports(source)
+        if imports is not None:
+            return {"imports": sorted(imports)}
+
+    file_ast = parse_source(source, path)
+
+    with timed("visit", path):
+        if len(analyses) == 1:
+            # A single analysis skips the dispatcher and uses the visitor's own (faster) run.
+            name = analyses[0]
+            results = {name: _ANALYSES[name][0]().run(file_ast)}
+        else:
+            visitors = {name: _ANALYSES[name][0]() for name in analyses}
+            results = MultiVisitor(visitors).run(file_ast)
+
+    return {name: _ANALYSES[name][1](result) for name, result in results.items()}
+
+
+def _analyze_file_or_error(path: pathlib.Path, analyses: Tuple[str, ...]) -> Dict[str, Any]:
+    try:
+        return _analyze_file(path, analyses)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _analyze_file_to_cache(
+    path: pathlib.Path, analyses: Tuple[str, ...], catch_errors: bool
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    # The results, with the digest of the contents they were computed from (None on error):
+    # the file may have been saved again since, and its new contents must not get them.
+    from asyntree.cache import content_digest
+
+    try:
+        source = read_source(path)
+        return _analyze_source(source, path, analyses), content_digest(source)
+    except Exception as e:
+        if not catch_errors:
+            raise
+        return {"error": str(e)}, None
+
+
+def _iter_files(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]],
+    excl_dir: Optional[List[str]],
+    use_gitignore: bool,
+    stat: bool,
+) -> Iterator[_File]:
+    # Files to be looked up in caches are stat'ed while walking (for their size and mtime);
+    # the others aren't stat'ed at all.
+    discover = iter_records if stat else iter_directory
+    return discover(
+        directory_path, incl_ext=incl_ext, excl_dir=excl_dir, use_gitignore=use_gitignore
+    )
+
+
+def _file_path(file: _File) -> pathlib.Path:
+    return file.path if isinstance(file, FileRecord) else file
+
+
+def _analyze_files(
+    analyses: Tuple[str, ...],
+    files: Iterable[_File],
+    *,
+    workers: int,
+    cache_dir: Optional[pathlib.Path],
+    cache: Optional["MemoryCache"] = None,
+    catch_errors: bool = False,
+) -> Iterator[Tuple[pathlib.Path, Dict[str, Any]]]:
+    # Yields (path, results) pairs in input order. With caches (`cache` in memory, then the
+    # on-disk one), unchanged files are served from them and only the misses are parsed (in
+    # the worker pool, when there is one); files given as FileRecords aren't stat'ed again.
+    # With `catch_errors`, a file that fails gets {"error": message} as results (never cached).
+    if cache_dir is None and cache is None:
+        func = functools.partial(
+            _analyze_file_or_error if catch_errors else _analyze_file, analyses=analyses
+        )
+        paths, pending = itertools.tee(map(_file_path, files))
+        yield from zip(paths, _map_files(func, pending, workers))
+        return
+
+    with contextlib.ExitStack() as stack:
+        caches: List[Any] = [] if cache is None else [cache]
+        if cache_dir is not None:
+            from asyntree.cache import Cache
+
+            caches.append(stack.enter_context(Cache(cache_dir)))
+
+        files = [
+            (file.path, file.fingerprint) if isinstance(file, FileRecord) else (file, None)
+            for file in files
+        ]
+        cached = [_cached_results(caches, path, fp, analyses) for path, fp in files]
+
+        func = functools.partial(
+            _analyze_file_to_cache, analyses=analyses, catch_errors=catch_errors
+        )
+        computed = _map_files(
+            func, [path for (path, _), r in zip(files, cached) if r is None], workers
+        )
+
+        for (path, fingerprint), results in zip(files, cached):
+            if results is None:
+                results, digest = next(computed)
+                if digest is not None:
+                    for c in caches:
+                        for name, value in results.items():
+                            c.set(path, name, value, fingerprint=fingerprint, digest=digest)
+            yield path, results
+
+
+def _cached_results(
+    caches: Sequence[Any],
+    path: pathlib.Path,
+    fingerprint: Optional[Fingerprint],
+    analyses: Tuple[str, ...],
+) -> Optional[Dict[str, Any]]:
+    # The first cache with all the results wins, and the ones before it are filled in.
+    for i, cache in enumerate(caches):
+        results = {name: cache.get(path, name, fingerprint=fingerprint) for name in analyses}
+        if None not in results.values():
+            for missed in caches[:i]:
+                for name, value in results.items():
+                    missed.set(path, name, value, fingerprint=fingerprint)
+            return results
+    return None
+
+
+def _watch_workers(workers: int, paths: Sequence[pathlib.Path]) -> int:
+    # Starting a process pool costs more than parsing the few files of a typical change.
+    return workers if len(paths) > _CHUNK_SIZE else 1
+
+
+def _map_files(
+    func: Callable[[pathlib.Path], Any], paths: Iterable[pathlib.Path], workers: int
+) -> Iterator[Any]:
+    # Results are yielded in input order, so the parallel path is deterministic and matches
+    # the serial one. Workers only send back the (small) per-file results, never AST objects.
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        yield from map(func, paths)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=deactivate) as executor:
+        yield from executor.map(func, paths, chunksize=_CHUNK_SIZE)
@@ -0,0 +1,267 @@
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from asyntree.parser import Fingerprint
+
+DEFAULT_CACHE_DIR = ".asyntree_cache"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# New entries are written in transactions of this many rows, so the database is locked briefly.
+_BATCH_SIZE = 256
+
+# Node counts depend on the grammar of the running interpreter, so entries written by another
+# Python version (or another schema) are discarded when the cache is opened.
+_VERSION = f"1:{sys.version_info.major}.{sys.version_info.minor}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    value TEXT NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (path, kind)
+);
+"""
+
+
+class Cache:
+    """Persistent SQLite cache of per-file analysis results.
+
+    Several processes can use the same cache: reads never write, new entries are committed in
+    small batches, and access times are updated when the cache is closed.
+    """
+
+    def __init__(
+        self, directory: pathlib.Path = DEFAULT_CACHE_DIR, *, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+
+        prepare_cache_dir(self.directory)
+
+        # Pending writes: rows to insert, and (mtime_ns, accessed) of the entries that were read.
+        self._pending: Dict[Tuple[str, str], Tuple[Any, ...]] = {}
+        self._touched: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+        # Autocommit, so that nothing is held locked between the transactions below; another
+        # process writing at the same time is waited for.
+        self._db = sqlite3.connect(
+            self.directory / "cache.sqlite3", timeout=30, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(_SCHEMA)
+
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != _VERSION:
+            with self._transaction():
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (_VERSION,))
+
+    def __enter__(self) -> "Cache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(
+        self, path: pathlib.Path, kind: str, *, fingerprint: Optional[Fingerprint] = None
+    ) -> Optional[Any]:
+        """Return the cached value, or None if the file changed since it was stored.
+
+        The file's `fingerprint` (size and mtime) is stat'ed when not given.
+        """
+        if fingerprint is None:
+            fingerprint = _stat_fingerprint(path)
+            if fingerprint is None:
+                return None
+        current_size, current_mtime_ns = fingerprint
+
+        key = (str(path), kind)
+        row = (
+            self._pending.get(key)
+            or self._db.execute(
+                "SELECT mtime_ns, size, digest, value FROM entries WHERE path = ? AND kind = ?", key
+            ).fetchone()
+        )
+        if row is None:
+            return None
+
+        mtime_ns, size, digest, value = row[:4]
+        if current_size != size:
+            return None
+        if current_mtime_ns != mtime_ns:
+            # Touched but possibly unchanged (e.g. after a checkout), so compare the contents.
+            if _file_digest(path) != digest:
+                return None
+            mtime_ns = current_mtime_ns
+
+        self._touched[key] = (mtime_ns, time.time())
+        return json.loads(value)
+
+    def set(
+        self,
+        path: pathlib.Path,
+        kind: str,
+        value: Any,
+        *,
+        fingerprint: Optional[Fingerprint] = None,
+        digest: Optional[str] = None,
+    ) -> None:
+        """Store `value` for the file.
+
+        `digest` is the `content_digest` of the contents `value` was computed from; the file is
+        read again when it is not given, so it should be passed whenever the file may have
+        changed since.
+        """
+        size, mtime_ns = fingerprint or _stat_fingerprint(path, strict=True)
+        key = (str(path), kind)
+        self._pending[key] = (
+            mtime_ns,
+            size,
+            digest or _file_digest(path),
+            json.dumps(value, separators=(",", ":")),
+            time.time(),
+        )
+        self._touched.pop(key, None)
+        if len(self._pending) >= _BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the new entries and access times recorded so far."""
+        pending, self._pending = self._pending, {}
+        touched, self._touched = self._touched, {}
+        if not pending and not touched:
+            return
+
+        with self._transaction():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, *row) for key, row in pending.items()],
+            )
+            self._db.executemany(
+                "UPDATE entries SET mtime_ns = ?, accessed = ? WHERE path = ? AND kind = ?",
+                [(mtime_ns, accessed, *key) for key, (mtime_ns, accessed) in touched.items()],
+            )
+
+    def evict(self) -> None:
+        """Drop the least recently used entries until the cache fits in `max_size` bytes."""
+        rows = self._db.execute(
+            "SELECT rowid, LENGTH(path) + LENGTH(value) FROM entries ORDER BY accessed DESC"
+        )
+
+        total = 0
+        stale = []
+        for rowid, size in rows:
+            total += size
+            if total > self.max_size:
+                stale.append((rowid,))
+
+        if stale:
+            with self._transaction():
+                self._db.executemany("DELETE FROM entries WHERE rowid = ?", stale)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+            self.evict()
+        finally:
+            self._db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # Takes the write lock up front, so waiting for another writer happens here (up to the
+        # connection's timeout) rather than failing halfway through.
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+class MemoryCache:
+    """In-memory cache of per-file analysis results, for long-running processes.
+
+    Entries are checked against the file's size and mtime only, and kept until the file
+    changes. It has the `get`/`set` interface of `Cache`, which it is used in front of.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Fingerprint, Any]] = {}
+
+    def get(
+        self, path: pathlib.Path, kind: str, *, fingerprint: Optional[Fingerprint] = None
+    ) -> Optional[Any]:
+        """Return the cached value, or None if the file changed since it was stored."""
+        key = (str(path), kind)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if fingerprint is None:
+            fingerprint = _stat_fingerprint(path)
+            if fingerprint is None:
+                del self._entries[key]
+                return None
+
+        stored, value = entry
+        if stored != fingerprint:
+            return None
+        return value
+
+    def set(
+        self,
+        path: pathlib.Path,
+        kind: str,
+        value: Any,
+        *,
+        fingerprint: Optional[Fingerprint] = None,
+        digest: Optional[str] = None,
+    ) -> None:
+        fingerprint = fingerprint or _stat_fingerprint(path, strict=True)
+        self._entries[(str(path), kind)] = (tuple(fingerprint), value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def prepare_cache_dir(directory: pathlib.Path) -> None:
+    """Create the cache directory, with a .gitignore so it is never committed."""
+    directory.mkdir(parents=True, exist_ok=True)
+    gitignore_path = directory / ".gitignore"
+    if not gitignore_path.exists():
+        gitignore_path.write_text("*\n")
+
+
+def _stat_fingerprint(path: pathlib.Path, *, strict: bool = False) -> Optional[Fingerprint]:
+    # None for a file that can't be stat'ed, unless `strict`, in which case the error is raised.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        if strict:
+            raise
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def content_digest(data: bytes) -> str:
+    """The digest the cache compares file contents with."""
+    return hashlib.blake2b(data).hexdigest()
+
+
+def _file_digest(path: pathlib.Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()
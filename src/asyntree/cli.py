@@ -1,13 +1,28 @@
+import contextlib
+import json
+import os
 import pathlib
-from typing import Annotated, List, Optional
+import shutil
+import sys
+from typing import TYPE_CHECKING, Annotated, Any, Dict, Iterable, Iterator, List, Optional
 
 import typer
 from rich import print
 
 from asyntree import api
+from asyntree.llm import PREFETCH_BYTES, estimate_tokens
+from asyntree.profiling import active_profile
+
+if TYPE_CHECKING:
+    from rich.table import Table
+
+# Keep startup fast: anything that only some commands need is imported when they run (see
+# tests/test_import_time.py).
 
 app = typer.Typer(add_completion=False)
 
+_FORMATS = ("table", "json", "jsonl")
+
 
 @app.command("describe")
 def cli_describe(
@@ -15,12 +30,64 @@ def cli_describe(
     exclude: Annotated[
         Optional[List[str]], typer.Option("--exclude", "-e", help="Directory names to exclude")
     ] = None,
+    gitignore: Annotated[
+        bool, typer.Option("--gitignore", "-g", help="Skip files ignored by .gitignore")
+    ] = False,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Number of worker processes (0 uses all cores)")
+    ] = 1,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="Disable the on-disk analysis cache")
+    ] = False,
+    output_format: Annotated[
+        str, typer.Option("--format", "-f", help="Output format: table, json or jsonl")
+    ] = "table",
+    watch: Annotated[
+        bool, typer.Option("--watch", "-w", help="Keep running, updating as files change")
+    ] = False,
+    socket_path: Annotated[
+        Optional[pathlib.Path],
+        typer.Option(
+            "--socket",
+            envvar="ASYNTREE_SOCKET",
+            help="Forward to the `asyntree serve` listening on this socket (if there is one)",
+        ),
+    ] = None,
+    profile: Annotated[
+        bool, typer.Option("--profile", help="Print the time spent per stage (on stderr)")
+    ] = False,
+    profile_json: Annotated[
+        Optional[pathlib.Path],
+        typer.Option("--profile-json", help="Write the time spent per stage to a JSON file"),
+    ] = None,
 ) -> None:
     """Print the ast nodes of all python files."""
     try:
-        validated_path = _validate_path(path)
-        cli_output = api.describe(validated_path, incl_ext=[".py"], excl_dir=exclude)
-        print(cli_output)
+        with _profiling(profile, profile_json):
+            validated_path = _validate_path(path)
+            if output_format not in _FORMATS:
+                raise ValueError(f"Unknown format: {output_format} (use {', '.join(_FORMATS)})")
+
+            options: Dict[str, Any] = {
+                "incl_ext": [".py"],
+                "excl_dir": exclude,
+                "use_gitignore": gitignore,
+                "workers": jobs,
+                "cache_dir": _cache_dir(no_cache),
+            }
+            response = None if watch else _forward(socket_path, "describe", validated_path, options)
+            if watch:
+                with _until_interrupted():
+                    for update in api.watch_describe(validated_path, **options):
+                        _print_describe_update(update, output_format)
+            elif output_format == "table":
+                print(response["result"] if response else api.describe(validated_path, **options))
+            else:
+                # Streamed: each file is written as soon as it is parsed.
+                records = (
+                    response["result"] if response else api.iter_describe(validated_path, **options)
+                )
+                _write_json(records, lines=output_format == "jsonl")
     except Exception as e:
         print(f"Error: {e}")
         raise typer.Exit(1)
@@ -35,12 +102,78 @@ def cli_to_tree(
     exclude: Annotated[
         Optional[List[str]], typer.Option("--exclude", "-e", help="Directory names to exclude")
     ] = None,
+    gitignore: Annotated[
+        bool, typer.Option("--gitignore", "-g", help="Skip files ignored by .gitignore")
+    ] = False,
+    max_depth: Annotated[
+        Optional[int],
+        typer.Option("--max-depth", "-d", help="Collapse directories below N levels"),
+    ] = None,
+    max_entries_per_dir: Annotated[
+        Optional[int],
+        typer.Option("--max-entries-per-dir", help="Collapse the entries of a directory past N"),
+    ] = None,
+    summarize: Annotated[
+        bool,
+        typer.Option("--summarize", "-s", help="Show directories only, with file counts and sizes"),
+    ] = False,
+    plain: Annotated[
+        bool,
+        typer.Option(
+            "--plain", help="Print plain text lines, without Rich (the default when piped)"
+        ),
+    ] = False,
+    socket_path: Annotated[
+        Optional[pathlib.Path],
+        typer.Option(
+            "--socket",
+            envvar="ASYNTREE_SOCKET",
+            help="Forward to the `asyntree serve` listening on this socket (if there is one)",
+        ),
+    ] = None,
+    profile: Annotated[
+        bool, typer.Option("--profile", help="Print the time spent per stage (on stderr)")
+    ] = False,
+    profile_json: Annotated[
+        Optional[pathlib.Path],
+        typer.Option("--profile-json", help="Write the time spent per stage to a JSON file"),
+    ] = None,
 ) -> None:
     """Print the tree structure of the directory."""
     try:
-        validated_path = _validate_path(path)
-        cli_output = api.to_tree(validated_path, incl_ext=include, excl_dir=exclude)
-        print(cli_output)
+        with _profiling(profile, profile_json):
+            validated_path = _validate_path(path)
+            options: Dict[str, Any] = {
+                "incl_ext": include,
+                "excl_dir": exclude,
+                "use_gitignore": gitignore,
+                "max_depth": max_depth,
+                "max_entries_per_dir": max_entries_per_dir,
+                "summarize": summarize,
+            }
+            if plain or not sys.stdout.isatty():
+                options["ascii"] = not _can_encode(sys.stdout, "├──")
+                response = _forward(
+                    socket_path, "to-tree", validated_path, {**options, "plain": True}
+                )
+                if response:
+                    sys.stdout.write(response["result"])
+                else:
+                    sys.stdout.writelines(
+                        f"{line}\n" for line in api.iter_tree(validated_path, **options)
+                    )
+                return
+
+            # The server renders the tree for this terminal.
+            console = {"width": shutil.get_terminal_size().columns, "color": sys.stdout.isatty()}
+            response = _forward(socket_path, "to-tree", validated_path, {**options, **console})
+            if response and response["result"] is not None:
+                sys.stdout.write(response["result"])
+            else:
+                print(response["result"] if response else api.to_tree(validated_path, **options))
+    except BrokenPipeError:
+        # The reader went away (e.g. `asyntree to-tree . | head`): there's no one to tell.
+        _discard_stdout()
     except Exception as e:
         print(f"Error: {e}")
         raise typer.Exit(1)
@@ -55,17 +188,96 @@ def cli_to_llm(
     exclude: Annotated[
         Optional[List[str]], typer.Option("--exclude", "-e", help="Directory names to exclude")
     ] = None,
+    gitignore: Annotated[
+        bool, typer.Option("--gitignore", "-g", help="Skip files ignored by .gitignore")
+    ] = False,
     output_file: Annotated[
         str, typer.Option("--output", "-o", help="Output file name")
     ] = "llm.txt",
+    budget: Annotated[
+        Optional[int],
+        typer.Option("--budget", "-b", help="Maximum number of (estimated) tokens to export"),
+    ] = None,
+    shard_bytes: Annotated[
+        Optional[int], typer.Option("--shard-bytes", help="Split the output into shards of N bytes")
+    ] = None,
+    shard_tokens: Annotated[
+        Optional[int],
+        typer.Option("--shard-tokens", help="Split the output into shards of N (estimated) tokens"),
+    ] = None,
+    io_threads: Annotated[
+        int, typer.Option("--io-threads", help="Number of threads reading files ahead")
+    ] = 1,
+    prefetch_bytes: Annotated[
+        int, typer.Option("--prefetch-bytes", help="Maximum bytes held by read-ahead threads")
+    ] = PREFETCH_BYTES,
+    incremental: Annotated[
+        bool,
+        typer.Option("--incremental", help="Only re-read files changed since the last export"),
+    ] = False,
+    skip_binary: Annotated[
+        bool, typer.Option("--skip-binary", help="Skip files that look binary")
+    ] = False,
+    max_file_size: Annotated[
+        Optional[int], typer.Option("--max-file-size", help="Skip files larger than N bytes")
+    ] = None,
+    dedupe: Annotated[bool, typer.Option("--dedupe", help="Export identical files once")] = False,
+    watch: Annotated[
+        bool, typer.Option("--watch", "-w", help="Keep running, updating as files change")
+    ] = False,
+    socket_path: Annotated[
+        Optional[pathlib.Path],
+        typer.Option(
+            "--socket",
+            envvar="ASYNTREE_SOCKET",
+            help="Forward to the `asyntree serve` listening on this socket (if there is one)",
+        ),
+    ] = None,
+    profile: Annotated[
+        bool, typer.Option("--profile", help="Print the time spent per stage (on stderr)")
+    ] = False,
+    profile_json: Annotated[
+        Optional[pathlib.Path],
+        typer.Option("--profile-json", help="Write the time spent per stage to a JSON file"),
+    ] = None,
 ) -> None:
     """Generate (and export) the llm.txt file."""
     try:
-        validated_path = _validate_path(path)
-        cli_output = api.to_llm(
-            validated_path, incl_ext=include, excl_dir=exclude, output_file=output_file
-        )
-        print(f"Exported to: {cli_output}")
+        with _profiling(profile, profile_json):
+            validated_path = _validate_path(path)
+            token_report: List[Dict[str, Any]] = []
+            options: Dict[str, Any] = {
+                "incl_ext": include,
+                "excl_dir": exclude,
+                "use_gitignore": gitignore,
+                "output_file": output_file,
+                "max_tokens": budget,
+                "shard_size": shard_bytes,
+                "shard_tokens": shard_tokens,
+                "io_threads": io_threads,
+                "prefetch_bytes": prefetch_bytes,
+                "skip_binary": skip_binary,
+                "max_file_size": max_file_size,
+                "dedupe": dedupe,
+            }
+            on_file = token_report.append if budget is not None else None
+            if watch:
+                # Watching always updates the export incrementally, when it can.
+                with _until_interrupted():
+                    for cli_output in api.watch_llm(validated_path, on_file=on_file, **options):
+                        _print_llm_export(cli_output, token_report, budget)
+                        token_report.clear()
+                return
+
+            options["incremental"] = incremental
+            response = _forward(socket_path, "to-llm", validated_path, options)
+            if response:
+                output = response["result"]["output"]
+                cli_output = pathlib.Path(output) if output else None
+                token_report.extend(response["result"]["files"])
+            else:
+                cli_output = api.to_llm(validated_path, on_file=on_file, **options)
+            _print_llm_export(cli_output, token_report, budget)
     except Exception as e:
         print(f"Error: {e}")
         raise typer.Exit(1)
@@ -77,22 +289,232 @@ def cli_to_requirements(
     exclude: Annotated[
         Optional[List[str]], typer.Option("--exclude", "-e", help="Directory names to exclude")
     ] = None,
+    gitignore: Annotated[
+        bool, typer.Option("--gitignore", "-g", help="Skip files ignored by .gitignore")
+    ] = False,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Number of worker processes (0 uses all cores)")
+    ] = 1,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="Disable the on-disk analysis cache")
+    ] = False,
+    pin: Annotated[
+        bool, typer.Option("--pin", help="Pin requirements to the installed versions")
+    ] = False,
     output_file: Annotated[
         str, typer.Option("--output", "-o", help="Output file name")
     ] = "requirements.txt",
+    watch: Annotated[
+        bool, typer.Option("--watch", "-w", help="Keep running, updating as files change")
+    ] = False,
+    socket_path: Annotated[
+        Optional[pathlib.Path],
+        typer.Option(
+            "--socket",
+            envvar="ASYNTREE_SOCKET",
+            help="Forward to the `asyntree serve` listening on this socket (if there is one)",
+        ),
+    ] = None,
+    profile: Annotated[
+        bool, typer.Option("--profile", help="Print the time spent per stage (on stderr)")
+    ] = False,
+    profile_json: Annotated[
+        Optional[pathlib.Path],
+        typer.Option("--profile-json", help="Write the time spent per stage to a JSON file"),
+    ] = None,
 ) -> None:
     """Generate (and export) the requirements.txt file."""
     try:
-        validated_path = _validate_path(path)
-        cli_output = api.to_requirements(
-            validated_path, incl_ext=[".py"], excl_dir=exclude, output_file=output_file
-        )
-        print(f"Exported to: {cli_output}")
+        with _profiling(profile, profile_json):
+            validated_path = _validate_path(path)
+            options: Dict[str, Any] = {
+                "incl_ext": [".py"],
+                "excl_dir": exclude,
+                "use_gitignore": gitignore,
+                "workers": jobs,
+                "cache_dir": _cache_dir(no_cache),
+                "pin": pin,
+                "output_file": output_file,
+            }
+            if watch:
+                with _until_interrupted():
+                    for cli_output in api.watch_requirements(validated_path, **options):
+                        print(f"Exported to: {cli_output}")
+            elif response := _forward(socket_path, "to-requirements", validated_path, options):
+                print(f"Exported to: {response['result']}")
+            else:
+                cli_output = api.to_requirements(validated_path, **options)
+                print(f"Exported to: {cli_output}")
     except Exception as e:
         print(f"Error: {e}")
         raise typer.Exit(1)
 
 
+@app.command("serve")
+def cli_serve(
+    socket_path: Annotated[
+        Optional[pathlib.Path],
+        typer.Option(
+            "--socket",
+            envvar="ASYNTREE_SOCKET",
+            help="Socket to listen on (default: .asyntree_cache/server.sock)",
+        ),
+    ] = None,
+) -> None:
+    """Answer the other commands (run with --socket) from a warm, long-running process."""
+    try:
+        from asyntree.cache import DEFAULT_CACHE_DIR, prepare_cache_dir
+        from asyntree.server import SOCKET_NAME, Server
+
+        if socket_path is None:
+            socket_path = pathlib.Path(DEFAULT_CACHE_DIR) / SOCKET_NAME
+            prepare_cache_dir(socket_path.parent)
+
+        with Server(socket_path) as server:
+            print(f"Listening on: {socket_path.resolve()}")
+            with _until_interrupted():
+                server.serve_forever()
+    except Exception as e:
+        print(f"Error: {e}")
+        raise typer.Exit(1)
+
+
+def _forward(
+    socket_path: Optional[pathlib.Path], command: str, path: pathlib.Path, options: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    # The server's response ({"result": ...}), or None to run the command here: without a
+    # socket, when no server is listening on it, or when profiling (this process).
+    if socket_path is None or active_profile() is not None:
+        return None
+
+    from asyntree.server import request
+
+    try:
+        return {"result": request(socket_path, command, path, options)}
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+
+def _print_describe_update(update: Dict[str, List[Any]], output_format: str) -> None:
+    # JSON Lines only has the records that changed (and the paths removed), the other formats
+    # have all of them.
+    if output_format == "table":
+        print(update["results"])
+    elif output_format == "json":
+        sys.stdout.write(json.dumps(update["results"]) + "\n")
+    else:
+        removed = [{"path": path, "removed": True} for path in update["removed"]]
+        _write_json(update["changed"] + removed, lines=True)
+    sys.stdout.flush()
+
+
+def _write_json(records: Iterable[Dict[str, Any]], *, lines: bool) -> None:
+    write = sys.stdout.write
+    if lines:
+        for record in records:
+            write(json.dumps(record) + "\n")
+        return
+
+    write("[")
+    for i, record in enumerate(records):
+        write(("," if i else "") + "\n" + json.dumps(record))
+    write("\n]\n")
+
+
+def _print_llm_export(
+    cli_output: Optional[pathlib.Path], token_report: List[Dict[str, Any]], budget: Optional[int]
+) -> None:
+    if budget is not None:
+        # The output may be a manifest of shards, so count the blocks that were written.
+        used = estimate_tokens(sum(entry.get("length", 0) for entry in token_report))
+        print(_token_report_table(token_report, used, budget))
+    print(f"Exported to: {cli_output}")
+
+
+@contextlib.contextmanager
+def _profiling(table: bool, json_path: Optional[pathlib.Path]) -> Iterator[None]:
+    # The profile is printed as a table on stderr (keeping stdout for the command's output),
+    # and/or written as JSON, also when the command fails.
+    if not table and json_path is None:
+        yield
+        return
+
+    try:
+        with api.profile() as recorder:
+            yield
+    finally:
+        report = recorder.report()
+        if json_path is not None:
+            json_path.write_text(json.dumps(report, indent=2))
+        if table:
+            from rich.console import Console
+
+            Console(stderr=True).print(*_profile_tables(report))
+
+
+@contextlib.contextmanager
+def _until_interrupted() -> Iterator[None]:
+    # Watching goes on until Ctrl+C, which ends it successfully.
+    try:
+        yield
+    except KeyboardInterrupt:
+        pass
+
+
+def _token_report_table(token_report: List[Dict[str, Any]], used: int, budget: int) -> "Table":
+    from rich.table import Table
+
+    table = Table("Path", "Tokens", "Status")
+    for entry in sorted(token_report, key=lambda e: e["path"]):
+        style = "green" if entry["status"] == "included" else "red"
+        table.add_row(entry["path"], str(entry["tokens"]), entry["status"], style=style)
+
+    table.caption = f"{used} / {budget} tokens (estimated)"
+    return table
+
+
+def _can_encode(stream: Any, text: str) -> bool:
+    try:
+        text.encode(getattr(stream, "encoding", None) or "utf-8")
+    except (UnicodeEncodeError, LookupError):
+        return False
+    return True
+
+
+def _discard_stdout() -> None:
+    # Python flushes stdout again on exit, which would fail the same way.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+
+def _profile_tables(report: Dict[str, Any]) -> List["Table"]:
+    from rich.filesize import decimal
+    from rich.table import Table
+
+    stages = Table("Stage", "Time", "Files", "Bytes")
+    slowest = Table("Stage", "Time", "Slowest files")
+    for stage, entry in report["stages"].items():
+        n_bytes = decimal(entry["bytes"]) if entry["bytes"] else ""
+        n_files = str(entry["files"]) if entry["files"] else ""
+        stages.add_row(stage, _milliseconds(entry["seconds"]), n_files, n_bytes)
+        for file in entry["slowest"]:
+            slowest.add_row(stage, _milliseconds(file["seconds"]), file["path"])
+        slowest.add_section()
+
+    stages.caption = f"{_milliseconds(report['elapsed'])} elapsed"
+    return [stages, slowest]
+
+
+def _milliseconds(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def _cache_dir(no_cache: bool) -> Optional[pathlib.Path]:
+    from asyntree.cache import DEFAULT_CACHE_DIR
+
+    return None if no_cache else pathlib.Path(DEFAULT_CACHE_DIR)
+
+
 def _validate_path(value: str) -> pathlib.Path:
     path = pathlib.Path(value).resolve() if value else pathlib.Path.cwd()
 
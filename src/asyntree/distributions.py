@@ -0,0 +1,70 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+import pathlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from asyntree.cache import prepare_cache_dir
+
+DistributionIndex = Dict[str, List[Tuple[str, str]]]
+
+
+def load_distribution_index(cache_dir: Optional[pathlib.Path] = None) -> DistributionIndex:
+    """Map top-level import names to the installed distributions (name, version) providing them.
+
+    The index is built from `importlib.metadata` once per environment. With `cache_dir`, it is
+    persisted there and reused until a directory on `sys.path` changes (packages installed or
+    removed).
+    """
+    if cache_dir is None:
+        return build_distribution_index()
+
+    environment = hashlib.blake2b(
+        f"{sys.executable}\n{sys.prefix}".encode(), digest_size=8
+    ).hexdigest()
+    index_path = pathlib.Path(cache_dir) / f"distributions-{environment}.json"
+    fingerprint = _environment_fingerprint()
+
+    try:
+        data = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        data = None
+    if data is not None and data.get("fingerprint") == fingerprint:
+        return {module: [tuple(d) for d in dists] for module, dists in data["modules"].items()}
+
+    index = build_distribution_index()
+    prepare_cache_dir(index_path.parent)
+    index_path.write_text(json.dumps({"fingerprint": fingerprint, "modules": index}))
+    return index
+
+
+def build_distribution_index() -> DistributionIndex:
+    """Build the import name to distributions index (see `load_distribution_index`)."""
+    versions: Dict[str, str] = {}
+    for dist in importlib.metadata.distributions():
+        # The first distribution found on sys.path is the one that gets imported.
+        name = dist.metadata["Name"]
+        if name:
+            versions.setdefault(name, dist.version)
+
+    # Top-level names come from top_level.txt, or are inferred from RECORD.
+    return {
+        module: sorted({(name, versions.get(name, "")) for name in names})
+        for module, names in importlib.metadata.packages_distributions().items()
+    }
+
+
+def _environment_fingerprint() -> List[str]:
+    cwd = os.getcwd()
+    fingerprint = [sys.version]
+    for entry in sys.path:
+        # The working directory changes all the time, and rarely holds installed distributions.
+        if not entry or entry == cwd:
+            continue
+        try:
+            fingerprint.append(f"{entry}:{os.stat(entry).st_mtime_ns}")
+        except OSError:
+            continue
+    return fingerprint
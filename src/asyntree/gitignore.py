@@ -0,0 +1,149 @@
+import os
+import pathlib
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+Rule = Tuple[re.Pattern, bool, bool]
+
+
+class GitIgnore:
+    """Compiled matcher for the patterns of a single .gitignore file."""
+
+    def __init__(self, lines: Iterable[str]):
+        self.rules: List[Rule] = []
+
+        for line in lines:
+            rule = _compile_rule(line)
+            if rule is not None:
+                self.rules.append(rule)
+
+        if self.rules:
+            self._any = re.compile("|".join(f"(?:{r.pattern})" for r, _, _ in self.rules))
+        else:
+            self._any = None
+
+    @classmethod
+    def from_file(cls, path: pathlib.Path) -> "GitIgnore":
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return cls(f.read().splitlines())
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """Return whether the path is ignored, or None if no pattern applies to it."""
+        if self._any is None or not self._any.match(relative_path):
+            return None
+
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                return not negate
+
+        return None
+
+
+def find_parent_gitignores(path: pathlib.Path) -> List[Tuple[str, GitIgnore]]:
+    """Load the .gitignore files between the enclosing repository root and `path`."""
+    for repo_root in (path, *path.parents):
+        if (repo_root / ".git").exists():
+            break
+    else:
+        return []
+
+    parents = [p for p in path.parents if p == repo_root or repo_root in p.parents]
+
+    rv = []
+    for directory in reversed(parents):
+        gitignore_path = directory / ".gitignore"
+        if gitignore_path.is_file():
+            rv.append((str(directory), GitIgnore.from_file(gitignore_path)))
+
+    return rv
+
+
+def is_ignored(path: str, is_dir: bool, ignores: Sequence[Tuple[str, GitIgnore]]) -> bool:
+    """Check a path against the matchers in scope, with deeper .gitignore files taking precedence."""
+    for base, gitignore in reversed(ignores):
+        relative_path = path[len(base) + 1 :]
+        if os.sep != "/":
+            relative_path = relative_path.replace(os.sep, "/")
+
+        rv = gitignore.match(relative_path, is_dir)
+        if rv is not None:
+            return rv
+
+    return False
+
+
+def _compile_rule(line: str) -> Optional[Rule]:
+    while line.endswith(" ") and not line.endswith("\\ "):
+        line = line[:-1]
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+
+    anchored = "/" in line
+    line = line.lstrip("/")
+    if not line:
+        return None
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(prefix + _translate(line) + r"\Z"), negate, dir_only
+
+
+def _translate(pattern: str) -> str:
+    i, n = 0, len(pattern)
+    rv = []
+
+    while i < n:
+        c = pattern[i]
+
+        if c == "*":
+            if pattern[i : i + 2] == "**":
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n or pattern[i + 2] == "/"
+                if at_start and at_end:
+                    if i + 2 == n:
+                        rv.append(".*")
+                        i += 2
+                    else:
+                        rv.append("(?:.*/)?")
+                        i += 3
+                    continue
+                i += 1
+            rv.append("[^/]*")
+        elif c == "?":
+            rv.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+
+            if j >= n:
+                rv.append(re.escape(c))
+            else:
+                chars = pattern[i + 1 : j]
+                negate = chars[0] in "!^"
+                if negate:
+                    chars = chars[1:]
+                chars = chars.replace("\\", "\\\\").replace("[", "\\[")
+                rv.append(f"[{'^' if negate else ''}{chars}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            rv.append(re.escape(pattern[i]))
+        else:
+            rv.append(re.escape(c))
+
+        i += 1
+
+    return "".join(rv)
@@ -0,0 +1,152 @@
+import pathlib
+import re
+from typing import Iterable, Optional, Set
+
+# Horizontal whitespace, or a backslash line continuation.
+_WS = rb"(?:[ \t\f]|\\\r?\n)"
+_NAME = rb"[A-Za-z_][A-Za-z0-9_]*"
+_DOTTED = rb"%s(?:%s*\.%s*%s)*" % (_NAME, _WS, _WS, _NAME)
+
+# String patterns consume runs of plain characters at once rather than one at a time.
+_STRING = rb"|".join(
+    [
+        rb"'''[^'\\]*+(?:(?:\\.|'(?!''))[^'\\]*+)*+'''",
+        rb'"""[^"\\]*+(?:(?:\\.|"(?!""))[^"\\]*+)*+"""',
+        rb"'[^'\\\n]*+(?:\\.[^'\\\n]*+)*+'",
+        rb'"[^"\\\n]*+(?:\\.[^"\\\n]*+)*+"',
+    ]
+)
+# Skips code, strings and comments up to the next `import` outside of a string or comment (or
+# the end of the source). The possessive loop never backtracks, so each call is linear.
+_NEXT_IMPORT = re.compile(
+    rb"(?:[^'\"#i]++|%s|#[^\n]*+|i(?!mport\b))*+(?:(?P<keyword>import\b)|\Z)" % _STRING,
+    re.DOTALL,
+)
+
+_IMPORT = re.compile(
+    rb"import%s+(?P<names>%s(?:%s+as%s+%s)?(?:%s*,%s*%s(?:%s+as%s+%s)?)*)%s*(?=[;#\r\n]|\Z)"
+    % (_WS, _DOTTED, _WS, _WS, _NAME, _WS, _WS, _DOTTED, _WS, _WS, _NAME, _WS)
+)
+_IMPORT_NAME = re.compile(rb"(?:^|,)%s*(%s)" % (_WS, _NAME))
+_FROM = re.compile(
+    rb"[ \t\f]*from%s*(?P<dots>(?:\.%s*)*)(?P<module>%s)?%s*import\b" % (_WS, _WS, _DOTTED, _WS)
+)
+
+
+def scan_imports(source: bytes) -> Optional[Set[str]]:
+    """Find the top-level modules imported by Python source, without building an AST.
+
+    Gives the same result as `ImportVisitor` on the parsed source, including imports nested in
+    functions, classes and `try` blocks. Returns None when the source can't be scanned with
+    certainty (e.g. an `import` after `;` or `:`, non-ASCII names, or an unusual encoding),
+    in which case the caller should fall back to the AST. The source is not checked for
+    syntax errors.
+    """
+    if b"import" not in source:
+        return set()
+    if b"\0" in source:
+        return None
+
+    imports = set()
+    pos = 0
+    while True:
+        match = _NEXT_IMPORT.match(source, pos)
+        if match is None:
+            # Stopped at something that isn't code, e.g. an unterminated string.
+            return None
+        if match.group("keyword") is None:
+            return imports
+
+        start = match.start("keyword")
+        pos = match.end()
+        if start > 0 and _is_name_char(source[start - 1]):
+            # Part of a longer name, e.g. `__import__` or `reimport`.
+            continue
+
+        line_start = _logical_line_start(source, start)
+        if not source[line_start:start].strip(b" \t\f"):
+            statement = _IMPORT.match(source, start)
+            if statement is None:
+                return None
+            for name in _IMPORT_NAME.finditer(statement.group("names")):
+                imports.add(name.group(1).decode())
+        else:
+            # The `import` of `from x import y`, on the same (logical) line as its `from`.
+            statement = _FROM.match(source, line_start)
+            if statement is None or statement.end() != pos:
+                # An `import` that doesn't start a line: `try: import x`, `x = 1; import y`, ...
+                return None
+            module = statement.group("module")
+            if module and not statement.group("dots"):
+                imports.add(re.match(_NAME, module).group().decode())
+        pos = statement.end()
+
+
+def first_party_modules(relative_paths: Iterable[pathlib.PurePath]) -> Set[str]:
+    """Top-level module names that a project's own files can be imported as.
+
+    Paths are relative to the directory containing the project, so the project directory is the
+    first part. The names are those of the modules and directories directly under an import
+    root (the project directory, and any `src` directory in it, e.g. `packages/alpha/src` in a
+    monorepo), of the outermost package (a directory with `__init__.py`) of every package, and
+    of the namespace package above one (`ns` in `ns/pkg/__init__.py`: a directory with no
+    modules of its own, whose subdirectories are all packages). Other directories above a file
+    don't give their names, so `examples/django/demo.py` doesn't make `django` first-party. A
+    project that is a package itself gives just its own name.
+    """
+    paths = [pathlib.PurePath(path) for path in relative_paths]
+    paths = [path for path in paths if path.suffix == ".py"]
+    if not paths:
+        return set()
+    packages = {path.parent for path in paths if path.name == "__init__.py"}
+
+    project = pathlib.PurePath(paths[0].parts[0])
+    if project in packages:
+        return {project.name}
+
+    directories = {parent for path in paths for parent in path.parents if project in parent.parents}
+    module_directories = {path.parent for path in paths}
+    roots = {project} | {
+        directory
+        for directory in directories
+        if directory.name == "src"
+        and not any(parent in packages for parent in (directory, *directory.parents))
+    }
+
+    def is_namespace(directory: pathlib.PurePath) -> bool:
+        return (
+            directory in directories
+            and directory not in roots
+            and directory not in module_directories
+            and all(child in packages for child in directories if child.parent == directory)
+        )
+
+    modules = set()
+    for path in paths:
+        root = max(
+            (parent for parent in path.parents if parent in roots), key=lambda p: len(p.parts)
+        )
+        parts = path.relative_to(root).parts
+        modules.add(parts[0] if len(parts) > 1 else path.stem)
+
+        package = next((parent for parent in path.parents if parent in packages), None)
+        if package is not None:
+            while package.parent in packages:
+                package = package.parent
+            modules.add(package.name)
+            if is_namespace(package.parent):
+                modules.add(package.parent.name)
+
+    return modules
+
+
+def _logical_line_start(source: bytes, pos: int) -> int:
+    # The start of the line containing `pos`, following backslash continuations backwards.
+    line_start = source.rfind(b"\n", 0, pos) + 1
+    while source.endswith((b"\\\n", b"\\\r\n"), 0, line_start):
+        line_start = source.rfind(b"\n", 0, line_start - 1) + 1
+    return line_start
+
+
+def _is_name_char(byte: int) -> bool:
+    return byte == 95 or 48 <= byte <= 57 or 65 <= byte <= 90 or 97 <= byte <= 122 or byte >= 128
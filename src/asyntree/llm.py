@@ -0,0 +1,652 @@
+import codecs
+import collections
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from asyntree.parser import Fingerprint
+from asyntree.profiling import timed
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+CHUNK_SIZE = 1024 * 1024
+PREFETCH_BYTES = 64 * 1024 * 1024
+INDEX_VERSION = 2
+SNIFF_SIZE = 8 * 1024
+
+# Roughly four bytes per token for source code and English text with common BPE vocabularies.
+BYTES_PER_TOKEN = 4
+
+PATHS_HEADER = b"<<<--- File Paths --->>>\n\n"
+CONTENTS_HEADER = b"\n<<<--- File Contents --->>>\n\n"
+
+_BLOCK_TAGS = len('<file path="">\n\n</file>\n\n')
+
+
+def estimate_tokens(n_bytes: int) -> int:
+    """Estimate the number of tokens for `n_bytes` of text, without a tokenizer."""
+    return -(-n_bytes // BYTES_PER_TOKEN)
+
+
+def export_llm(
+    file_paths: Sequence[pathlib.Path],
+    relative_to: pathlib.Path,
+    output_path: pathlib.Path,
+    *,
+    chunk_size: Optional[int] = CHUNK_SIZE,
+    max_tokens: Optional[int] = None,
+    shard_size: Optional[int] = None,
+    io_threads: int = 1,
+    prefetch_bytes: int = PREFETCH_BYTES,
+    incremental: bool = False,
+    skip_binary: bool = False,
+    max_file_size: Optional[int] = None,
+    dedupe: bool = False,
+    fingerprints: Optional[Sequence[Optional[Fingerprint]]] = None,
+    on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> pathlib.Path:
+    """Export the files to `output_path`, or to shards of at most `shard_size` bytes.
+
+    With `max_tokens`, files are chosen by priority (shallow paths, then small files) until the
+    estimated budget is used up; the others are skipped before being read. When sharding, each
+    file is kept whole in one shard, and a JSON manifest mapping every path to its shard, byte
+    offset and length is written (and returned) in place of `output_path`. `on_file` receives a
+    report entry for every file. With `incremental`, the export is updated in place (see
+    `update_llm`); see `write_llm` for the other options. The files' `fingerprints` (size and
+    mtime, None for a file that can't be stat'ed) are looked up when not given.
+    """
+    if incremental and shard_size is not None:
+        raise ValueError("Incremental export does not support sharding")
+    if incremental and dedupe:
+        raise ValueError("Incremental export does not support deduplication")
+
+    relative_paths = [file_path.relative_to(relative_to) for file_path in file_paths]
+    if fingerprints is None:
+        fingerprints = [_file_fingerprint(file_path) for file_path in file_paths]
+    sizes = [fingerprint[0] if fingerprint else 0 for fingerprint in fingerprints]
+
+    if max_tokens is not None:
+        included, skipped = select_within_budget(relative_paths, sizes, max_tokens)
+        if on_file is not None:
+            for i, tokens in skipped:
+                on_file({"path": str(relative_paths[i]), "tokens": tokens, "status": "skipped"})
+        file_paths = [file_paths[i] for i in included]
+        relative_paths = [relative_paths[i] for i in included]
+        sizes = [sizes[i] for i in included]
+        fingerprints = [fingerprints[i] for i in included]
+
+    write_options: Dict[str, Any] = {
+        "chunk_size": chunk_size,
+        "io_threads": io_threads,
+        "prefetch_bytes": prefetch_bytes,
+        "skip_binary": skip_binary,
+        "max_file_size": max_file_size,
+        "dedupe": dedupe,
+    }
+
+    if incremental:
+        return update_llm(
+            output_path, file_paths, relative_paths, fingerprints, on_file=on_file, **write_options
+        )
+
+    if shard_size is None:
+        with open(output_path, "wb") as f:
+            write_llm(f, file_paths, relative_paths, sizes=sizes, on_file=on_file, **write_options)
+        return output_path
+
+    manifest_path = output_path.with_name(f"{output_path.stem}.manifest.json")
+    previous_shards = _manifest_shards(manifest_path)
+
+    manifest: Dict[str, Any] = {"shards": [], "files": []}
+    for n, shard in enumerate(plan_shards(relative_paths, sizes, shard_size), start=1):
+        shard_path = output_path.with_name(f"{output_path.stem}.{n:03d}{output_path.suffix}")
+        manifest["shards"].append(shard_path.name)
+
+        def on_shard_file(entry: Dict[str, Any]) -> None:
+            manifest["files"].append(
+                {k: entry[k] for k in ("path", "offset", "length")} | {"shard": shard_path.name}
+            )
+            if on_file is not None:
+                on_file(entry)
+
+        with open(shard_path, "wb") as f:
+            write_llm(
+                f,
+                [file_paths[i] for i in shard],
+                [relative_paths[i] for i in shard],
+                sizes=[sizes[i] for i in shard],
+                on_file=on_shard_file,
+                **write_options,
+            )
+
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    # The previous export may have been split into more shards.
+    for name in previous_shards:
+        shard_path = output_path.with_name(name)
+        if name not in manifest["shards"] and _is_shard(output_path, shard_path):
+            shard_path.unlink(missing_ok=True)
+
+    return manifest_path
+
+
+def update_llm(
+    output_path: pathlib.Path,
+    file_paths: Sequence[pathlib.Path],
+    relative_paths: Sequence[pathlib.Path],
+    fingerprints: Sequence[Optional[Fingerprint]],
+    *,
+    on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **write_options: Any,
+) -> pathlib.Path:
+    """Bring `output_path` up to date, re-reading only the files that changed since the last run.
+
+    A sidecar index (`{stem}.index.json`) records each file's size, mtime and block location.
+    When nothing changed the export is left untouched; otherwise unchanged blocks are copied
+    from the previous export and only new or modified files are read. Without a usable index
+    (or if the export was modified, or written with other options, since), everything is
+    rewritten.
+    """
+    index_path = output_path.with_name(f"{output_path.stem}.index.json")
+    # As stored in (and read back from) the JSON index.
+    fingerprints = [list(fingerprint) if fingerprint else None for fingerprint in fingerprints]
+    options = {k: write_options.get(k) for k in ("skip_binary", "max_file_size")}
+
+    previous = _load_index(index_path, output_path, options)
+    blocks = {entry["path"]: entry for entry in previous["files"]} if previous else {}
+
+    reused: List[Optional[Dict[str, Any]]] = []
+    for relative_path, fingerprint in zip(relative_paths, fingerprints):
+        block = blocks.get(str(relative_path))
+        if block is None or fingerprint is None or block["fingerprint"] != fingerprint:
+            block = None
+        reused.append(block)
+
+    paths_unchanged = previous is not None and [e["path"] for e in previous["files"]] == [
+        str(relative_path) for relative_path in relative_paths
+    ]
+    if paths_unchanged and all(block is not None for block in reused):
+        if on_file is not None:
+            for block in reused:
+                on_file(_report_entry(block))
+        return output_path
+
+    entries: List[Dict[str, Any]] = []
+
+    def on_index_file(entry: Dict[str, Any]) -> None:
+        entries.append(entry)
+        if on_file is not None:
+            on_file(entry)
+
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        with contextlib.ExitStack() as stack:
+            out = stack.enter_context(open(tmp_path, "wb"))
+            previous_output = None
+            if any(block is not None for block in reused):
+                previous_output = stack.enter_context(open(output_path, "rb"))
+            write_llm(
+                out,
+                file_paths,
+                relative_paths,
+                sizes=[fingerprint[0] if fingerprint else 0 for fingerprint in fingerprints],
+                reuse=(previous_output, reused) if previous_output else None,
+                on_file=on_index_file,
+                **write_options,
+            )
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    st = os.stat(output_path)
+    index = {
+        "version": INDEX_VERSION,
+        "output": [st.st_size, st.st_mtime_ns],
+        "options": options,
+        "files": [
+            {k: entry[k] for k in ("path", "status", "offset", "length")}
+            | {"fingerprint": fingerprint}
+            for entry, fingerprint in zip(entries, fingerprints)
+        ],
+    }
+    index_path.write_text(json.dumps(index))
+    return output_path
+
+
+def is_export_file(output_path: pathlib.Path, path: pathlib.Path) -> bool:
+    """Whether `path` is written when exporting to `output_path` (shards, manifest and index)."""
+    if path.parent != output_path.parent:
+        return False
+
+    name, stem = output_path.name, output_path.stem
+    if path.name in (name, f".{name}.tmp", f"{stem}.index.json", f"{stem}.manifest.json"):
+        return True
+    return _is_shard(output_path, path)
+
+
+def _is_shard(output_path: pathlib.Path, path: pathlib.Path) -> bool:
+    # Shards are numbered from 001, e.g. llm.001.txt for llm.txt.
+    stem, suffix = output_path.stem, output_path.suffix
+    shard = path.name[len(stem) + 1 : len(path.name) - len(suffix)]
+    return (
+        path.name.startswith(f"{stem}.")
+        and path.name.endswith(suffix)
+        and len(shard) >= 3
+        and shard.isdigit()
+    )
+
+
+def _manifest_shards(manifest_path: pathlib.Path) -> List[str]:
+    # The shards listed in an existing manifest, if it can be read.
+    try:
+        shards = json.loads(manifest_path.read_text())["shards"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+    return [name for name in shards if isinstance(name, str) and os.sep not in name]
+
+
+def _load_index(
+    index_path: pathlib.Path, output_path: pathlib.Path, options: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    try:
+        index = json.loads(index_path.read_text())
+        st = os.stat(output_path)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        index.get("version") != INDEX_VERSION
+        or index.get("output") != [st.st_size, st.st_mtime_ns]
+        or index.get("options") != options
+    ):
+        return None
+    return index
+
+
+def _report_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "path": entry["path"],
+        "tokens": estimate_tokens(entry["length"]),
+        "status": entry["status"],
+        "offset": entry["offset"],
+        "length": entry["length"],
+    }
+
+
+def write_llm(
+    out: BinaryIO,
+    file_paths: Sequence[pathlib.Path],
+    relative_paths: Sequence[pathlib.Path],
+    *,
+    chunk_size: Optional[int] = CHUNK_SIZE,
+    sizes: Optional[Sequence[int]] = None,
+    io_threads: int = 1,
+    prefetch_bytes: int = PREFETCH_BYTES,
+    skip_binary: bool = False,
+    max_file_size: Optional[int] = None,
+    dedupe: bool = False,
+    reuse: Optional[Tuple[BinaryIO, Sequence[Optional[Dict[str, Any]]]]] = None,
+    on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> None:
+    """Stream the llm.txt contents for the given files into a binary writer.
+
+    With `io_threads` > 1, files are read ahead in a thread pool (see `prefetch_files`).
+    Files larger than `max_file_size` are skipped without being read, `skip_binary` skips files
+    whose first few KB look binary, and `dedupe` replaces files identical to an earlier one with
+    a reference to it. `reuse` is a previous export and, per file, the block to copy from it
+    (or None to read the file).
+    """
+    out.write(PATHS_HEADER)
+    for relative_path in relative_paths:
+        out.write(f"{relative_path}\n".encode())
+
+    out.write(CONTENTS_HEADER)
+
+    if sizes is None:
+        sizes = [_file_size(file_path) for file_path in file_paths]
+    previous_output, reused = reuse if reuse is not None else (None, [None] * len(file_paths))
+    too_large = [max_file_size is not None and size > max_file_size for size in sizes]
+    seen: Dict[bytes, str] = {}
+
+    with contextlib.ExitStack() as stack:
+        prefetched: Iterator[Optional[Future[bytes]]] = itertools.repeat(None)
+        if io_threads > 1:
+            to_read = [i for i in range(len(file_paths)) if reused[i] is None and not too_large[i]]
+            prefetched = stack.enter_context(
+                contextlib.closing(
+                    prefetch_files(
+                        [file_paths[i] for i in to_read],
+                        [sizes[i] for i in to_read],
+                        threads=io_threads,
+                        max_bytes=prefetch_bytes,
+                        skip_binary=skip_binary,
+                    )
+                )
+            )
+
+        for i, (file_path, relative_path) in enumerate(zip(file_paths, relative_paths)):
+            start = out.tell()
+            if reused[i] is not None:
+                previous_output.seek(reused[i]["offset"])
+                out.write(previous_output.read(reused[i]["length"]))
+                status = reused[i]["status"]
+            elif too_large[i]:
+                _write_note_block(out, relative_path, f"Skipped: larger than {max_file_size} bytes")
+                status = "large"
+            else:
+                hasher = hashlib.blake2b(digest_size=16) if dedupe and sizes[i] else None
+                with timed("export", file_path) as timer:
+                    status = write_file_block(
+                        out,
+                        file_path,
+                        relative_path,
+                        chunk_size=chunk_size,
+                        size=sizes[i] or None,
+                        data=next(prefetched),
+                        skip_binary=skip_binary,
+                        hasher=hasher,
+                    )
+                    timer.bytes = out.tell() - start
+                if hasher is not None and status == "included":
+                    first = seen.setdefault(hasher.digest(), str(relative_path))
+                    if first != str(relative_path):
+                        out.seek(start)
+                        out.truncate()
+                        _write_note_block(out, relative_path, f"Duplicate of {first}")
+                        status = "duplicate"
+
+            if on_file is not None:
+                length = out.tell() - start
+                on_file(
+                    {
+                        "path": str(relative_path),
+                        "tokens": estimate_tokens(length),
+                        "status": status,
+                        "offset": start,
+                        "length": length,
+                    }
+                )
+
+
+def write_file_block(
+    out: BinaryIO,
+    file_path: pathlib.Path,
+    relative_path: pathlib.Path,
+    *,
+    chunk_size: Optional[int] = CHUNK_SIZE,
+    size: Optional[int] = None,
+    data: Optional["Future[bytes]"] = None,
+    skip_binary: bool = False,
+    hasher: Optional[Any] = None,
+) -> str:
+    """Copy one file into a `<file>` block.
+
+    The file is read into a buffer of `chunk_size` bytes (the whole file when None), reused for
+    each chunk. Chunks are checked to be valid UTF-8 and written as they are, with universal
+    newlines translated: the same text as reading the file in text mode, without decoding it.
+    At most `size` bytes are copied (the size the file was found with), so a file growing
+    meanwhile, such as a previous export being overwritten, is not followed. `data` is the
+    file's contents when it was prefetched; otherwise the file is read here. The written text is
+    fed to `hasher`, if given. Returns the status of the block: "included", "binary" (skipped)
+    or "unreadable".
+    """
+    start = out.tell()
+    out.write(f'<file path="{relative_path}">\n'.encode())
+
+    def write(text: Any) -> None:
+        out.write(text)
+        if hasher is not None:
+            hasher.update(text)
+
+    try:
+        if data is not None:
+            contents = data.result()
+            if skip_binary and is_binary(contents[:SNIFF_SIZE]):
+                return _replace_block(out, start, relative_path, "Skipped: binary file", "binary")
+            write(contents if _is_plain_text(contents) else _decode_text(contents).encode())
+        else:
+            with open(file_path, "rb") as f:
+                if skip_binary and is_binary(f.peek(SNIFF_SIZE)[:SNIFF_SIZE]):
+                    return _replace_block(
+                        out, start, relative_path, "Skipped: binary file", "binary"
+                    )
+                try:
+                    _copy_text(f, write, chunk_size, size)
+                except UnicodeDecodeError:
+                    # Report the position in the file rather than in the chunk.
+                    f.seek(0)
+                    f.read().decode("utf-8")
+                    raise
+        out.write(b"\n</file>\n\n")
+        return "included"
+    except Exception as e:
+        # Part of the file may already be written, so replace the whole block with the error.
+        return _replace_block(out, start, relative_path, f"Could not read file: {e}", "unreadable")
+
+
+def is_binary(head: bytes) -> bool:
+    """Guess whether a file is binary from its first bytes: a NUL byte or invalid UTF-8."""
+    if b"\0" in head:
+        return True
+    try:
+        # A multi-byte character may be cut off at the end of `head`, which is not an error.
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def _replace_block(
+    out: BinaryIO, start: int, relative_path: pathlib.Path, note: str, status: str
+) -> str:
+    out.seek(start)
+    out.truncate()
+    _write_note_block(out, relative_path, note)
+    return status
+
+
+def _write_note_block(out: BinaryIO, relative_path: pathlib.Path, note: str) -> None:
+    out.write(f'<file path="{relative_path}">\n{note}\n</file>\n\n'.encode())
+
+
+def prefetch_files(
+    file_paths: Sequence[pathlib.Path],
+    sizes: Sequence[int],
+    *,
+    threads: int,
+    max_bytes: int = PREFETCH_BYTES,
+    skip_binary: bool = False,
+) -> Iterator[Optional["Future[bytes]"]]:
+    """Read files ahead in a thread pool, yielding one future per file in input order.
+
+    Each file is read up to its size in `sizes` (to its end for a size of 0); with `skip_binary`,
+    a file whose first few KB look binary is not read past them. Reads may complete out of
+    order, but at most `max_bytes` of file contents are held at once.
+    Files larger than `max_bytes` are not prefetched (None is yielded), so they are streamed
+    by the writer instead.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending: collections.deque = collections.deque()
+        in_flight = 0
+        n_submitted = 0
+
+        for _ in range(len(file_paths)):
+            while n_submitted < len(file_paths) and len(pending) < threads * 4:
+                size = sizes[n_submitted]
+                if size > max_bytes:
+                    pending.append((None, 0))
+                elif pending and in_flight + size > max_bytes:
+                    break
+                else:
+                    future = executor.submit(
+                        _read_bytes, file_paths[n_submitted], size, skip_binary
+                    )
+                    pending.append((future, size))
+                    in_flight += size
+                n_submitted += 1
+
+            future, size = pending.popleft()
+            yield future
+            in_flight -= size
+
+
+def _read_bytes(file_path: pathlib.Path, size: int, skip_binary: bool = False) -> bytes:
+    # At most `size` bytes (the size the file was found with), or the whole file without one.
+    # A file skipped as binary is read no further than its head, which is what the writer sniffs.
+    with timed("read", file_path) as timer:
+        with open(file_path, "rb") as f:
+            head = f.peek(SNIFF_SIZE)[:SNIFF_SIZE]
+            data = head if skip_binary and is_binary(head) else f.read(size or -1)
+        timer.bytes = len(data)
+    return data
+
+
+def _copy_text(
+    f: BinaryIO, write: Callable[[Any], None], chunk_size: Optional[int], size: Optional[int]
+) -> None:
+    # Chunks are views of one buffer, so `write` must be done with each before the next read.
+    # "\r" and "\n" are never part of a multi-byte UTF-8 character, so newlines are translated
+    # on the bytes; a "\r" ending a chunk may be followed by the "\n" starting the next one.
+    # Without a `size`, the file is read to its end: a byte over its current size, so that most
+    # files take a single read (special files have no size).
+    remaining = size
+    if size is None:
+        size = os.fstat(f.fileno()).st_size
+        size = size + 1 if size else CHUNK_SIZE
+    buffer = bytearray(min(chunk_size, size) if chunk_size else size)
+    view = memoryview(buffer)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending_cr = False
+
+    while remaining != 0 and (n := f.readinto(view[: remaining or len(buffer)])):
+        if remaining is not None:
+            remaining -= n
+        chunk = view[:n]
+        decoder.decode(chunk)
+        if not pending_cr and buffer.find(b"\r", 0, n) == -1:
+            write(chunk)
+            continue
+
+        text = bytes(chunk)
+        if pending_cr and text.startswith(b"\n"):
+            text = text[1:]
+        pending_cr = text.endswith(b"\r")
+        write(text.replace(b"\r\n", b"\n").replace(b"\r", b"\n"))
+
+    decoder.decode(b"", final=True)
+
+
+def _is_plain_text(data: bytes) -> bool:
+    # Whether the bytes are exactly what reading them as text would give back: valid UTF-8
+    # without "\r" (which universal newlines would translate). Validated a chunk at a time.
+    if data.find(b"\r") != -1:
+        return False
+    if isinstance(data, bytes) and data.isascii():
+        return True
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for i in range(0, len(data), CHUNK_SIZE):
+            decoder.decode(data[i : i + CHUNK_SIZE])
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _decode_text(data: bytes) -> str:
+    # The same result as reading the file in text mode (strict UTF-8 and universal newlines).
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def select_within_budget(
+    relative_paths: Sequence[pathlib.Path], sizes: Sequence[int], max_tokens: int
+) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """Pick the files that fit in the token budget, based on their size on disk.
+
+    Returns the indices of the included files (in input order) and (index, tokens) pairs for the
+    skipped ones. Sizes are an upper bound on the decoded text, so readable files never exceed
+    the budget.
+    """
+    costs = [
+        estimate_tokens(_entry_bytes(relative_path, size))
+        for relative_path, size in zip(relative_paths, sizes)
+    ]
+
+    remaining = max_tokens - estimate_tokens(len(PATHS_HEADER) + len(CONTENTS_HEADER))
+    priority = sorted(
+        range(len(relative_paths)), key=lambda i: (len(relative_paths[i].parts), costs[i], i)
+    )
+
+    included, skipped = [], []
+    for i in priority:
+        if costs[i] <= remaining:
+            included.append(i)
+            remaining -= costs[i]
+        else:
+            skipped.append((i, costs[i]))
+
+    return sorted(included), sorted(skipped)
+
+
+def plan_shards(
+    relative_paths: Sequence[pathlib.Path], sizes: Sequence[int], shard_size: int
+) -> List[List[int]]:
+    """Group consecutive files into shards of at most `shard_size` bytes (estimated).
+
+    A file is never split, so a file larger than `shard_size` gets a shard of its own.
+    """
+    header_bytes = len(PATHS_HEADER) + len(CONTENTS_HEADER)
+
+    shards: List[List[int]] = [[]]
+    used = header_bytes
+    for i, (relative_path, size) in enumerate(zip(relative_paths, sizes)):
+        entry_bytes = _entry_bytes(relative_path, size)
+        if shards[-1] and used + entry_bytes > shard_size:
+            shards.append([])
+            used = header_bytes
+        shards[-1].append(i)
+        used += entry_bytes
+
+    return shards
+
+
+def _entry_bytes(relative_path: pathlib.Path, size: int) -> int:
+    # The path line in the header, the block tags around the contents, and the contents.
+    path_bytes = len(str(relative_path).encode())
+    return (path_bytes + 1) + (path_bytes + _BLOCK_TAGS) + size
+
+
+def _file_size(file_path: pathlib.Path) -> int:
+    fingerprint = _file_fingerprint(file_path)
+    return fingerprint[0] if fingerprint else 0
+
+
+def _file_fingerprint(file_path: pathlib.Path) -> Optional[Fingerprint]:
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
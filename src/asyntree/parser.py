@@ -1,43 +1,196 @@
 import ast
+import os
 import pathlib
 import re
-from typing import List, Optional
+from typing import Iterator, List, Optional, Set, Tuple
+
+from asyntree.gitignore import GitIgnore, find_parent_gitignores, is_ignored
+from asyntree.profiling import timed, timed_iter
+
+# A file's size and mtime (in nanoseconds), to tell whether it changed since it was last seen.
+Fingerprint = Tuple[int, int]
+
+
+class FileRecord:
+    """A file found while walking a directory, with the metadata read during the walk."""
+
+    __slots__ = ("path", "size", "mtime_ns")
+
+    def __init__(self, path: pathlib.Path, size: int, mtime_ns: int):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        return self.size, self.mtime_ns
+
+    def __repr__(self) -> str:
+        return f"FileRecord({str(self.path)!r}, size={self.size}, mtime_ns={self.mtime_ns})"
 
 
 def parse_directory(
     directory_path: str = None,
     incl_ext: Optional[List[str]] = None,
     excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
 ) -> List[pathlib.Path]:
+    return list(
+        iter_directory(
+            directory_path, incl_ext=incl_ext, excl_dir=excl_dir, use_gitignore=use_gitignore
+        )
+    )
+
+
+def iter_directory(
+    directory_path: str = None,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    scanned_dirs: Optional[List[str]] = None,
+) -> Iterator[pathlib.Path]:
+    entries = _scan(directory_path, incl_ext, excl_dir, use_gitignore, scanned_dirs)
+    return (pathlib.Path(entry.path) for entry in entries)
+
+
+def iter_records(
+    directory_path: str = None,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+) -> Iterator[FileRecord]:
+    """Like `iter_directory`, with the size and mtime of each file (stat'ed once, while walking).
+
+    Files that disappear before they are stat'ed are left out.
+    """
+    return _records(_scan(directory_path, incl_ext, excl_dir, use_gitignore))
+
+
+def _scan(
+    directory_path: Optional[str],
+    incl_ext: Optional[List[str]],
+    excl_dir: Optional[List[str]],
+    use_gitignore: bool,
+    scanned_dirs: Optional[List[str]] = None,
+) -> Iterator[os.DirEntry]:
     path = pathlib.Path(directory_path).resolve() if directory_path else pathlib.Path.cwd()
     if not path.exists():
         raise FileNotFoundError(f"No such file or directory: {path}")
     if not path.is_dir():
         raise NotADirectoryError(f"Path is not a directory: {path}")
 
-    files = [item for item in path.rglob("*") if item.is_file()]
-
-    if excl_dir:
-        exclude_set = {name.lower() for name in excl_dir}
-        files = [
-            f for f in files if not any(parent.name.lower() in exclude_set for parent in f.parents)
-        ]
+    exclude_set = {name.lower() for name in excl_dir} if excl_dir else None
+    ext_set = None
     if incl_ext:
         pattern = r"^\.[a-zA-Z]+"
         if not all(re.match(pattern, ext) for ext in incl_ext):
             raise ValueError("Extensions must start with '.' followed by alphabetic characters")
 
         ext_set = {ext.lower() for ext in incl_ext}
-        files = [f for f in files if f.suffix.lower() in ext_set]
 
-    return files
+    if exclude_set and any(p.name.lower() in exclude_set for p in (path, *path.parents)):
+        return iter(())
+
+    ignores = tuple(find_parent_gitignores(path)) if use_gitignore else None
+
+    return timed_iter("walk", _walk(str(path), ext_set, exclude_set, ignores, scanned_dirs))
+
+
+def _records(entries: Iterator[os.DirEntry]) -> Iterator[FileRecord]:
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        yield FileRecord(pathlib.Path(entry.path), st.st_size, st.st_mtime_ns)
 
 
 def parse_ast(path: pathlib.Path) -> ast.AST:
+    return parse_source(read_source(path), path)
+
+
+def parse_source(source: bytes, path: pathlib.Path) -> ast.AST:
+    with timed("parse", path) as timer:
+        timer.bytes = len(source)
+        return ast.parse(source, filename=path)
+
+
+def read_source(path: pathlib.Path) -> bytes:
     if not path.is_file() or path.suffix != ".py":
         raise ValueError(f"Path must be a Python file: {path}")
 
-    with open(path, "rb") as f:
-        rv = ast.parse(f.read(), filename=path)
+    with timed("read", path) as timer:
+        with open(path, "rb") as f:
+            source = f.read()
+        timer.bytes = len(source)
+    return source
+
+
+def _walk(
+    root: str,
+    ext_set: Optional[Set[str]],
+    exclude_set: Optional[Set[str]],
+    ignores: Optional[Tuple[Tuple[str, GitIgnore], ...]] = None,
+    scanned_dirs: Optional[List[str]] = None,
+) -> Iterator[os.DirEntry]:
+    # Files of a directory are yielded before descending into its subdirectories (the same
+    # order as `rglob`). Excluded and git-ignored directories are pruned here, before they
+    # are ever scanned. `ignores` is None when .gitignore files are not respected, and the
+    # directories scanned are appended to `scanned_dirs` (for watching them).
+    stack = [(root, ignores)]
+    while stack:
+        directory, ignores = stack.pop()
+        if scanned_dirs is not None:
+            scanned_dirs.append(directory)
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        if ignores is not None:
+            ignores = _with_gitignore(directory, entries, ignores)
+
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if exclude_set and entry.name.lower() in exclude_set:
+                        continue
+                    if ignores is not None and (
+                        entry.name == ".git" or is_ignored(entry.path, True, ignores)
+                    ):
+                        continue
+                    subdirs.append((entry.path, ignores))
+                elif entry.is_file():
+                    if ext_set is not None and _suffix(entry.name) not in ext_set:
+                        continue
+                    if ignores is not None and is_ignored(entry.path, False, ignores):
+                        continue
+                    yield entry
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+
+def _with_gitignore(
+    directory: str, entries: List[os.DirEntry], ignores: Tuple[Tuple[str, GitIgnore], ...]
+) -> Tuple[Tuple[str, GitIgnore], ...]:
+    for entry in entries:
+        if entry.name == ".gitignore" and entry.is_file():
+            try:
+                gitignore = GitIgnore.from_file(entry.path)
+            except OSError:
+                break
+            if gitignore.rules:
+                return (*ignores, (directory, gitignore))
+            break
+
+    return ignores
+
 
-    return rv
+def _suffix(name: str) -> str:
+    i = name.rfind(".")
+    if 0 < i < len(name) - 1:
+        return name[i:].lower()
+    return ""
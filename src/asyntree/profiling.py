@@ -0,0 +1,162 @@
+import contextlib
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SLOWEST = 10
+
+# The profile being recorded, if any (see `profile`).
+_active: Optional["Profile"] = None
+
+
+class Profile:
+    """Wall time, files and bytes recorded per stage, with the slowest files of each stage.
+
+    Stages are "walk" (finding files), "read" (reading their contents), "parse" (`ast.parse`),
+    "visit" (running the analyses on the AST, or scanning for imports), "export" (writing
+    llm.txt blocks) and "render" (drawing the tree). A stage's time is summed over its files,
+    so it can exceed the elapsed time when files are handled by several threads.
+    """
+
+    def __init__(
+        self,
+        *,
+        slowest: int = SLOWEST,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.slowest = slowest
+        self.on_event = on_event
+        self.elapsed = 0.0
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, path: Optional[Any] = None, n_bytes: int = 0) -> None:
+        """Record `seconds` spent in `stage`, on the file at `path` if there is one."""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {"seconds": 0.0, "files": 0, "bytes": 0, "heap": []}
+            entry["seconds"] += seconds
+            entry["bytes"] += n_bytes
+            if path is not None:
+                entry["files"] += 1
+                _push_bounded(entry["heap"], (seconds, str(path)), self.slowest)
+
+        if self.on_event is not None:
+            self.on_event({"stage": stage, "seconds": seconds, "path": path, "bytes": n_bytes})
+
+    def report(self) -> Dict[str, Any]:
+        """The recorded stages, as JSON-serializable data."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "seconds": entry["seconds"],
+                    "files": entry["files"],
+                    "bytes": entry["bytes"],
+                    "slowest": [
+                        {"path": path, "seconds": seconds}
+                        for seconds, path in sorted(entry["heap"], reverse=True)
+                    ],
+                }
+                for stage, entry in self._stages.items()
+            }
+        return {"elapsed": self.elapsed, "stages": stages}
+
+
+@contextlib.contextmanager
+def profile(
+    *, slowest: int = SLOWEST, on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Iterator[Profile]:
+    """Record where the time goes while the block runs, and yield the `Profile`.
+
+    `on_event` is called with every measurement ({"stage", "seconds", "path", "bytes"}) as it
+    is taken. Only work done in this process is recorded: files analyzed by worker processes
+    (`workers` > 1) show up in the stages of their callers only.
+    """
+    global _active
+
+    previous = _active
+    recorder = _active = Profile(slowest=slowest, on_event=on_event)
+    start = time.perf_counter()
+    try:
+        yield recorder
+    finally:
+        recorder.elapsed = time.perf_counter() - start
+        _active = previous
+
+
+def active_profile() -> Optional[Profile]:
+    """The profile being recorded, or None."""
+    return _active
+
+
+def deactivate() -> None:
+    """Stop recording in this process (worker processes may be forked while recording)."""
+    global _active
+    _active = None
+
+
+def timed(stage: str, path: Optional[Any] = None) -> Any:
+    """Time a block in `stage` of the active profile; does nothing when there is none."""
+    return _NULL_TIMER if _active is None else _Timer(_active, stage, path)
+
+
+def timed_iter(stage: str, items: Iterator[Any]) -> Iterator[Any]:
+    """Time each step of `items` in `stage` of the active profile (items as the files)."""
+    return items if _active is None else _timed_iter(_active, stage, items)
+
+
+def _timed_iter(recorder: Profile, stage: str, items: Iterator[Any]) -> Iterator[Any]:
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        try:
+            item = next(items)
+        except StopIteration:
+            recorder.add(stage, clock() - start)
+            return
+        recorder.add(stage, clock() - start, getattr(item, "path", item))
+        yield item
+
+
+class _Timer:
+    __slots__ = ("profile", "stage", "path", "bytes", "start")
+
+    def __init__(self, profile: Profile, stage: str, path: Optional[Any]):
+        self.profile = profile
+        self.stage = stage
+        self.path = path
+        self.bytes = 0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.profile.add(self.stage, time.perf_counter() - self.start, self.path, self.bytes)
+
+
+class _NullTimer:
+    # Shared by every block timed while nothing is recorded; `bytes` set on it are dropped.
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _push_bounded(heap: List[Tuple[float, str]], item: Tuple[float, str], size: int) -> None:
+    # Keeps the `size` largest items, smallest first.
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    elif size and item > heap[0]:
+        heapq.heapreplace(heap, item)
@@ -0,0 +1,160 @@
+import io
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import stat
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from asyntree import api
+
+if TYPE_CHECKING:
+    from asyntree.cache import MemoryCache
+
+SOCKET_NAME = "server.sock"
+
+# Options holding paths, which the client resolves (the server runs in another directory).
+_PATH_OPTIONS = ("cache_dir", "output_file")
+
+
+class Server(socketserver.UnixStreamServer):
+    """Answers `request`s on a Unix domain socket, keeping analysis results in memory.
+
+    Per-file results are kept between requests (and checked against the files' size and
+    mtime), so that only files changed since the previous request are parsed again. Requests
+    are handled one at a time, in the order they arrive. The socket is only accessible to the
+    user running the server, and removed when it is closed.
+    """
+
+    def __init__(self, socket_path: pathlib.Path):
+        from asyntree.cache import MemoryCache
+
+        self.socket_path = pathlib.Path(socket_path)
+        self.cache = MemoryCache()
+
+        _remove_stale_socket(self.socket_path)
+        super().__init__(str(self.socket_path), _RequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def request(
+    socket_path: pathlib.Path, command: str, path: pathlib.Path, options: Dict[str, Any]
+) -> Any:
+    """Run a command on the server listening on `socket_path`, and return its result.
+
+    Raises FileNotFoundError or ConnectionRefusedError if no server is listening, and
+    RuntimeError (with the server's message) if the command failed.
+    """
+    options = dict(options)
+    for name in _PATH_OPTIONS:
+        if options.get(name) is not None:
+            options[name] = str(pathlib.Path(options[name]).resolve())
+    message = {"command": command, "path": str(pathlib.Path(path).resolve()), "options": options}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(message).encode() + b"\n")
+            f.flush()
+            response = json.loads(f.readline())
+
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+
+def handle_request(request: Dict[str, Any], cache: Optional["MemoryCache"] = None) -> Any:
+    """Run a command (as sent by `request`) and return its result, as JSON-serializable data."""
+    handler = _HANDLERS.get(request.get("command"))
+    if handler is None:
+        raise ValueError(f"Unknown command: {request.get('command')}")
+
+    return handler(pathlib.Path(request["path"]), dict(request.get("options") or {}), cache)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            # A connection that only checks whether the server is up.
+            return
+
+        try:
+            response = {"result": handle_request(json.loads(line), self.server.cache)}
+        except Exception as e:
+            response = {"error": str(e)}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def _describe(path: pathlib.Path, options: Dict[str, Any], cache: Optional["MemoryCache"]) -> Any:
+    return api.describe(path, cache=cache, **options)
+
+
+def _to_tree(path: pathlib.Path, options: Dict[str, Any], cache: Optional["MemoryCache"]) -> Any:
+    if options.pop("plain", False):
+        return "".join(f"{line}\n" for line in api.iter_tree(path, **options))
+
+    # Rendered here, for the client's terminal, since Rich objects can't be sent back.
+    width = options.pop("width", 80)
+    color = options.pop("color", False)
+
+    tree = api.to_tree(path, **options)
+    if tree is None:
+        return None
+
+    from rich.console import Console
+
+    console = Console(
+        file=io.StringIO(),
+        width=width,
+        force_terminal=color,
+        color_system="standard" if color else None,
+    )
+    console.print(tree)
+    return console.file.getvalue()
+
+
+def _to_llm(path: pathlib.Path, options: Dict[str, Any], cache: Optional["MemoryCache"]) -> Any:
+    files: List[Dict[str, Any]] = []
+    output_path = api.to_llm(path, on_file=files.append, **options)
+    return {"output": str(output_path) if output_path else None, "files": files}
+
+
+def _to_requirements(
+    path: pathlib.Path, options: Dict[str, Any], cache: Optional["MemoryCache"]
+) -> Any:
+    output_path = api.to_requirements(path, cache=cache, **options)
+    return str(output_path) if output_path else None
+
+
+_HANDLERS: Dict[str, Callable[[pathlib.Path, Dict[str, Any], Optional["MemoryCache"]], Any]] = {
+    "describe": _describe,
+    "to-tree": _to_tree,
+    "to-llm": _to_llm,
+    "to-requirements": _to_requirements,
+}
+
+
+def _remove_stale_socket(socket_path: pathlib.Path) -> None:
+    # A socket left behind by a server that didn't exit cleanly is removed; a live one is not.
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"Not a socket: {socket_path}")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except ConnectionRefusedError:
+            socket_path.unlink()
+            return
+
+    raise FileExistsError(f"A server is already listening on: {socket_path}")
@@ -0,0 +1,200 @@
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from asyntree.parser import FileRecord
+
+if TYPE_CHECKING:
+    from rich.tree import Tree
+
+
+class DirectoryNode:
+    """A directory of the tree, with the number and total size of the files below it."""
+
+    __slots__ = ("name", "dirs", "files", "n_files", "size")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.dirs: Dict[str, DirectoryNode] = {}
+        self.files: List[Tuple[str, int]] = []
+        self.n_files = 0
+        self.size = 0
+
+    def entries(self, *, files: bool = True) -> List[Tuple[str, Union["DirectoryNode", int]]]:
+        """The subdirectories and (with `files`) the file sizes, by name."""
+        entries: List[Tuple[str, Union[DirectoryNode, int]]] = list(self.dirs.items())
+        if files:
+            entries.extend(self.files)
+        entries.sort(key=lambda entry: entry[0])
+        return entries
+
+
+def build_tree(name: str, root: str, records: Iterable[FileRecord]) -> DirectoryNode:
+    """Arrange the files found under `root` (a resolved directory path) into directories.
+
+    Hidden files are left out, as are directories holding nothing else. Counts and sizes are
+    aggregated in a single bottom-up pass once every file is placed.
+    """
+    prefix_len = len(os.path.join(root, ""))
+    root_node = DirectoryNode(name)
+    nodes = {"": root_node}
+
+    def directory_node(relative_dir: str) -> DirectoryNode:
+        node = nodes.get(relative_dir)
+        if node is None:
+            parent, _, dir_name = relative_dir.rpartition(os.sep)
+            parent_node = directory_node(parent)
+            node = nodes[relative_dir] = parent_node.dirs[dir_name] = DirectoryNode(dir_name)
+        return node
+
+    for record in records:
+        relative_dir, _, file_name = str(record.path)[prefix_len:].rpartition(os.sep)
+        if not file_name.startswith("."):
+            directory_node(relative_dir).files.append((file_name, record.size))
+
+    # Directories come after their parent here, so children are done before their parents.
+    for node in reversed(list(nodes.values())):
+        node.n_files += len(node.files)
+        node.size += sum(size for _, size in node.files)
+        for child in node.dirs.values():
+            node.n_files += child.n_files
+            node.size += child.size
+
+    return root_node
+
+
+# Guide lines, as drawn by Rich: blank, continuing, branch and last branch.
+GUIDES = ("    ", "│   ", "├── ", "└── ")
+ASCII_GUIDES = ("    ", "|   ", "+-- ", "`-- ")
+
+# Entries of the layout: depth (0 for the root), whether it is the last entry of its directory,
+# kind ("root", "dir", "file" or "more"), name, and details (size or summary) or None.
+_Entry = Tuple[int, bool, str, str, Optional[str]]
+
+_STYLES = {"root": None, "dir": "yellow bold", "file": "green", "more": "dim"}
+
+
+def to_rich(
+    root: DirectoryNode,
+    *,
+    max_depth: Optional[int] = None,
+    max_entries_per_dir: Optional[int] = None,
+    summarize: bool = False,
+) -> "Tree":
+    """Render the tree with Rich, creating nodes only for the entries that are shown.
+
+    Directories deeper than `max_depth` levels below the root are collapsed into a single
+    node, as are the entries of a directory past the first `max_entries_per_dir`; collapsed
+    nodes show the number and total size of their files. With `summarize`, only directories
+    are shown, each with the number and total size of the files below it.
+    """
+    from rich.text import Text
+    from rich.tree import Tree
+
+    trees: List[Tree] = []
+    for depth, _, kind, name, details in _layout(root, max_depth, max_entries_per_dir, summarize):
+        if kind == "more":
+            name = f"… {name}"
+        style = _STYLES[kind]
+        label = Text(name) if style is None else Text(name, style)
+        if details is not None:
+            label.append(f" ({details})", "blue")
+
+        del trees[depth:]
+        trees.append(trees[-1].add(label) if trees else Tree(label))
+
+    return trees[0]
+
+
+def iter_lines(
+    root: DirectoryNode,
+    *,
+    max_depth: Optional[int] = None,
+    max_entries_per_dir: Optional[int] = None,
+    summarize: bool = False,
+    ascii: bool = False,
+) -> Iterator[str]:
+    """Yield the lines of the tree as plain text (see `to_rich` for the options).
+
+    Lines are produced as the tree is traversed, without building any Rich objects. They look
+    like Rich's output without colors, drawn with `ASCII_GUIDES` when `ascii`.
+    """
+    blank, continuing, branch, last_branch = ASCII_GUIDES if ascii else GUIDES
+    ellipsis = "..." if ascii else "…"
+
+    # The guides drawn in front of the entries at each depth.
+    prefixes = [""]
+    for depth, is_last, kind, name, details in _layout(
+        root, max_depth, max_entries_per_dir, summarize
+    ):
+        if kind == "more":
+            name = f"{ellipsis} {name}"
+        line = name if details is None else f"{name} ({details})"
+        if depth == 0:
+            yield line
+            continue
+
+        del prefixes[depth:]
+        yield prefixes[-1] + (last_branch if is_last else branch) + line
+        prefixes.append(prefixes[-1] + (blank if is_last else continuing))
+
+
+def _layout(
+    root: DirectoryNode,
+    max_depth: Optional[int],
+    max_entries_per_dir: Optional[int],
+    summarize: bool,
+) -> Iterator[_Entry]:
+    # The entries that are shown, in display order (each directory followed by its entries).
+    from rich.filesize import decimal
+
+    yield 0, True, "root", root.name, _summary(root) if summarize or max_depth == 0 else None
+    if max_depth == 0:
+        return
+
+    stack = [(_shown_entries(root, max_entries_per_dir, summarize), 1)]
+    while stack:
+        entries, depth = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        is_last, name, value = entry
+        if isinstance(value, DirectoryNode):
+            collapsed = summarize or depth == max_depth
+            yield depth, is_last, "dir", name, _summary(value) if collapsed else None
+            if depth != max_depth:
+                stack.append((_shown_entries(value, max_entries_per_dir, summarize), depth + 1))
+        elif name is None:
+            n_entries, n_files, size = value
+            yield depth, is_last, "more", f"{n_entries} more", _format_summary(n_files, size)
+        else:
+            yield depth, is_last, "file", name, decimal(value)
+
+
+def _shown_entries(
+    node: DirectoryNode, max_entries_per_dir: Optional[int], summarize: bool
+) -> Iterator[Tuple[bool, Optional[str], Any]]:
+    # (is_last, name, directory or size) for the entries shown, then (is_last, None,
+    # (entries, files, size)) for the ones collapsed past `max_entries_per_dir`.
+    entries = node.entries(files=not summarize)
+    hidden = entries[max_entries_per_dir:] if max_entries_per_dir is not None else []
+    shown = entries[: len(entries) - len(hidden)]
+
+    for i, (name, value) in enumerate(shown, start=1):
+        yield i == len(shown) and not hidden, name, value
+
+    if hidden:
+        n_files = sum(e.n_files if isinstance(e, DirectoryNode) else 1 for _, e in hidden)
+        size = sum(e.size if isinstance(e, DirectoryNode) else e for _, e in hidden)
+        yield True, None, (len(hidden), n_files, size)
+
+
+def _summary(node: DirectoryNode) -> str:
+    return _format_summary(node.n_files, node.size)
+
+
+def _format_summary(n_files: int, size: int) -> str:
+    from rich.filesize import decimal
+
+    return f"{n_files} file{'' if n_files == 1 else 's'}, {decimal(size)}"
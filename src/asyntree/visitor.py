@@ -1,43 +1,165 @@
 import ast
 from collections import Counter
-from typing import Set
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+# Per node class, its `_fields` in reverse, so children are pushed onto the stack in an order
+# that pops them in source order (the same preorder as `ast.NodeVisitor`).
+_REVERSED_FIELDS: Dict[type, Tuple[str, ...]] = {}
 
 
 class Visitor(ast.NodeVisitor):
     """Visitor to count AST node types."""
 
+    node_types: Optional[Tuple[Type[ast.AST], ...]] = None
+
     def __init__(self):
-        self.nodes = []
+        self.counts: Dict[type, int] = {}
 
     def generic_visit(self, node):
-        self.nodes.append(node.__class__.__name__)
+        self.handle(node)
         super().generic_visit(node)
 
+    def handle(self, node):
+        self.counts[node.__class__] = self.counts.get(node.__class__, 0) + 1
+
+    def reset(self):
+        self.counts.clear()
+
+    def result(self) -> Counter:
+        return _name_counts(self.counts)
+
     def run(self, code):
-        self.nodes.clear()
-        self.visit(code)
-        return Counter(self.nodes)
+        self.reset()
+        self.counts.update(_count_nodes(code))
+        return self.result()
 
 
 class ImportVisitor(ast.NodeVisitor):
     """Visitor to extract import statements and dependencies."""
 
+    node_types: Optional[Tuple[Type[ast.AST], ...]] = (ast.Import, ast.ImportFrom)
+
     def __init__(self):
         self.imports = set()
 
     def visit_Import(self, node):
-        for alias in node.names:
-            top_level_module = alias.name.split(".")[0]
-            self.imports.add(top_level_module)
+        self.handle(node)
         self.generic_visit(node)
 
     def visit_ImportFrom(self, node):
-        if node.module and node.level == 0:
+        self.handle(node)
+        self.generic_visit(node)
+
+    def handle(self, node):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                top_level_module = alias.name.split(".")[0]
+                self.imports.add(top_level_module)
+        elif node.module and node.level == 0:
             top_level_module = node.module.split(".")[0]
             self.imports.add(top_level_module)
-        self.generic_visit(node)
 
-    def run(self, tree: ast.AST) -> Set[str]:
+    def reset(self):
         self.imports.clear()
-        self.visit(tree)
+
+    def result(self) -> Set[str]:
         return self.imports.copy()
+
+    def run(self, tree: ast.AST) -> Set[str]:
+        self.reset()
+        self.visit(tree)
+        return self.result()
+
+
+class MultiVisitor:
+    """Visitor to run several analyses in a single traversal of the AST.
+
+    Each analysis provides `reset()`, `handle(node)` and `result()`, and may restrict the
+    nodes it is handed through `node_types` (None means every node).
+    """
+
+    def __init__(self, visitors: Dict[str, Any]):
+        self.visitors = visitors
+        self._handlers: Dict[type, List[Any]] = {}
+
+    def run(self, tree: ast.AST) -> Dict[str, Any]:
+        for visitor in self.visitors.values():
+            visitor.reset()
+
+        handlers = self._handlers
+        for node in _iter_nodes(tree):
+            node_handlers = handlers.get(node.__class__)
+            if node_handlers is None:
+                node_handlers = handlers[node.__class__] = self._dispatch(node.__class__)
+            for handle in node_handlers:
+                handle(node)
+
+        return {name: visitor.result() for name, visitor in self.visitors.items()}
+
+    def _dispatch(self, node_type: type) -> List[Any]:
+        return [
+            visitor.handle
+            for visitor in self.visitors.values()
+            if visitor.node_types is None or issubclass(node_type, visitor.node_types)
+        ]
+
+
+def count_nodes(tree: ast.AST) -> Counter:
+    """Count the AST node types of a tree, without recursion or per-node method dispatch."""
+    return _name_counts(_count_nodes(tree))
+
+
+def _count_nodes(tree: ast.AST) -> Dict[type, int]:
+    counts: Dict[type, int] = {}
+    get_count = counts.get
+    reversed_fields = _REVERSED_FIELDS
+    node_type = ast.AST
+
+    stack = [tree]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        cls = node.__class__
+        counts[cls] = get_count(cls, 0) + 1
+
+        fields = reversed_fields.get(cls)
+        if fields is None:
+            fields = reversed_fields[cls] = cls._fields[::-1]
+        for name in fields:
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                for item in reversed(value):
+                    if isinstance(item, node_type):
+                        push(item)
+            elif isinstance(value, node_type):
+                push(value)
+
+    return counts
+
+
+def _iter_nodes(tree: ast.AST) -> Iterator[ast.AST]:
+    reversed_fields = _REVERSED_FIELDS
+
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+
+        cls = node.__class__
+        fields = reversed_fields.get(cls)
+        if fields is None:
+            fields = reversed_fields[cls] = cls._fields[::-1]
+        for name in fields:
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                stack.extend(item for item in reversed(value) if isinstance(item, ast.AST))
+            elif isinstance(value, ast.AST):
+                stack.append(value)
+
+
+def _name_counts(counts: Dict[type, int]) -> Counter:
+    rv = Counter()
+    for cls, count in counts.items():
+        rv[cls.__name__] += count
+    return rv
@@ -0,0 +1,227 @@
+import errno
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from asyntree.parser import Fingerprint, iter_directory
+
+if TYPE_CHECKING:
+    import ctypes
+
+POLL_INTERVAL = 1.0
+# Events arriving within this many seconds of each other (a save, a checkout) are batched.
+DEBOUNCE = 0.05
+
+Changes = Dict[str, List[pathlib.Path]]
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+# struct inotify_event: wd, mask, cookie and len, followed by a NUL-padded name of len bytes.
+_EVENT = struct.Struct("iIII")
+
+
+def iter_changes(
+    directory_path: pathlib.Path,
+    *,
+    incl_ext: Optional[List[str]] = None,
+    excl_dir: Optional[List[str]] = None,
+    use_gitignore: bool = False,
+    ignore: Optional[Callable[[pathlib.Path], bool]] = None,
+    polling: bool = False,
+    interval: float = POLL_INTERVAL,
+) -> Iterator[Changes]:
+    """Watch the files of a directory, yielding the changes each time there are some.
+
+    Each item has the current `files` (in discovery order) and the `changed` (new or modified)
+    and `removed` ones; the first lists every file as changed. Changes are picked up with
+    inotify where it is available, and by polling the files' size and mtime every `interval`
+    seconds otherwise (or with `polling`). Files for which `ignore` returns True, e.g. outputs
+    written into the directory, are left out.
+    """
+
+    def scan(scanned_dirs: Optional[List[str]] = None) -> Iterator[pathlib.Path]:
+        file_paths = iter_directory(
+            directory_path,
+            incl_ext=incl_ext,
+            excl_dir=excl_dir,
+            use_gitignore=use_gitignore,
+            scanned_dirs=scanned_dirs,
+        )
+        return file_paths if ignore is None else (p for p in file_paths if not ignore(p))
+
+    inotify = None if polling else _Inotify.open()
+    try:
+        scanned_dirs: List[str] = []
+        files = _fingerprints(scan(scanned_dirs))
+        if inotify is not None and not inotify.watch(scanned_dirs):
+            inotify.close()
+            inotify = None
+        yield {"files": list(files), "changed": list(files), "removed": []}
+
+        while True:
+            if inotify is None:
+                time.sleep(interval)
+                current = _fingerprints(scan())
+            else:
+                paths, rescan = inotify.read()
+                if paths is not None and ignore is not None:
+                    paths = {p for p in paths if not ignore(p)}
+                if paths is None:
+                    # Events were lost: look at everything again.
+                    scanned_dirs = []
+                    current = _fingerprints(scan(scanned_dirs))
+                elif not rescan and paths <= files.keys():
+                    # Only files that were already known changed: no need to walk the tree.
+                    fresh = _fingerprints(paths)
+                    current = {p: fresh.get(p, f) for p, f in files.items()}
+                    for path in paths - fresh.keys():
+                        current.pop(path, None)
+                else:
+                    scanned_dirs = []
+                    found = list(scan(scanned_dirs))
+                    fresh = _fingerprints(p for p in found if p in paths or p not in files)
+                    current = {}
+                    for path in found:
+                        if path in fresh:
+                            current[path] = fresh[path]
+                        elif path in files and path not in paths:
+                            current[path] = files[path]
+                if (paths is None or rescan) and not inotify.watch(scanned_dirs):
+                    inotify.close()
+                    inotify = None
+
+            changed = [p for p, f in current.items() if files.get(p) != f]
+            removed = [p for p in files if p not in current]
+            files = current
+            if changed or removed:
+                yield {"files": list(files), "changed": changed, "removed": removed}
+    finally:
+        if inotify is not None:
+            inotify.close()
+
+
+def _fingerprints(paths: Iterable[pathlib.Path]) -> Dict[pathlib.Path, Fingerprint]:
+    # Files that disappeared since they were found are left out.
+    rv = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        rv[path] = (st.st_size, st.st_mtime_ns)
+    return rv
+
+
+class _Inotify:
+    """Minimal inotify binding (through libc), watching a set of directories."""
+
+    def __init__(self, libc: "ctypes.CDLL", fd: int):
+        self._libc = libc
+        self._fd = fd
+        self._dirs: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls) -> Optional["_Inotify"]:
+        """Return a new instance, or None if inotify is not available."""
+        if not sys.platform.startswith("linux"):
+            return None
+
+        import ctypes
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def watch(self, directories: List[str]) -> bool:
+        """Watch exactly `directories`; False if the system limit of watches was reached."""
+        import ctypes
+
+        wanted = set(directories)
+        for wd, directory in list(self._dirs.items()):
+            if directory not in wanted:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+        watched = set(self._dirs.values())
+        for directory in wanted - watched:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = directory
+            elif ctypes.get_errno() not in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return False
+        return True
+
+    def read(self) -> Tuple[Optional[Set[pathlib.Path]], bool]:
+        """Wait for events; return the paths they are about, and whether to rescan the tree.
+
+        Events that aren't about a file in a watched directory (a directory created, moved or
+        removed, or a .gitignore changed) require a rescan. The paths are None if events were
+        lost, in which case every file should be looked at again.
+        """
+        select.select([self._fd], [], [])
+        time.sleep(DEBOUNCE)
+
+        paths: Optional[Set[pathlib.Path]] = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & _IN_Q_OVERFLOW:
+                    paths = None
+                elif mask & _IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                elif wd in self._dirs:
+                    if mask & (_IN_ISDIR | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                        rescan = True
+                    elif name and paths is not None:
+                        path = os.path.join(self._dirs[wd], os.fsdecode(name))
+                        paths.add(pathlib.Path(path))
+                        rescan = rescan or name == b".gitignore"
+
+        return paths, rescan
+
+    def close(self) -> None:
+        os.close(self._fd)
@@ -5,7 +5,9 @@ from typer.testing import CliRunner
 
 
 @pytest.fixture
-def fixt_cli_runner() -> CliRunner:
+def fixt_cli_runner(tmp_path, monkeypatch) -> CliRunner:
+    # Commands write their cache (and default outputs) to the working directory.
+    monkeypatch.chdir(tmp_path)
     return CliRunner()
 
 
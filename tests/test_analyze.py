@@ -0,0 +1,41 @@
+import pytest
+
+from asyntree import api
+
+
+class TestAnalyze:
+    def test_analyze_single_pass(self, fixt_complex_python_project, monkeypatch):
+        parsed = []
+        parse_source = api.parse_source
+
+        def counting_parse_source(source, path):
+            parsed.append(path)
+            return parse_source(source, path)
+
+        monkeypatch.setattr(api, "parse_source", counting_parse_source)
+
+        result = api.analyze(fixt_complex_python_project, incl_ext=[".py"])
+
+        assert len(parsed) == len(result) == 3
+        assert {item["path"] for item in result} == {"main.py", "helpers.py", "__init__.py"}
+        assert all(set(item) == {"path", "ast", "imports"} for item in result)
+
+    def test_analyze_matches_describe(self, fixt_complex_python_project):
+        described = api.describe(fixt_complex_python_project, incl_ext=[".py"])
+        analyzed = api.analyze(fixt_complex_python_project, incl_ext=[".py"])
+
+        assert [item["ast"] for item in analyzed] == [item["ast"] for item in described]
+        main = next(item for item in analyzed if item["path"] == "main.py")
+        assert main["imports"] == ["flask", "os", "pandas", "requests", "sys"]
+
+    def test_analyze_with_cache(self, tmp_path, fixt_complex_python_project):
+        cache_dir = tmp_path / "cache"
+        api.describe(fixt_complex_python_project, incl_ext=[".py"], cache_dir=cache_dir)
+
+        result = api.analyze(fixt_complex_python_project, incl_ext=[".py"], cache_dir=cache_dir)
+
+        assert result == api.analyze(fixt_complex_python_project, incl_ext=[".py"])
+
+    def test_analyze_unknown_analysis(self, fixt_complex_python_project):
+        with pytest.raises(ValueError, match="Unknown analyses: calls"):
+            api.analyze(fixt_complex_python_project, analyses=["ast", "calls"])
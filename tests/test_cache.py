@@ -0,0 +1,159 @@
+import os
+
+from asyntree import api
+from asyntree.cache import Cache, MemoryCache
+
+
+class TestCache:
+    def test_cache_roundtrip(self, tmp_path, fixt_python_project):
+        file_path = fixt_python_project / "test_file.py"
+
+        with Cache(tmp_path / "cache") as cache:
+            assert cache.get(file_path, "ast") is None
+            cache.set(file_path, "ast", {"Module": 1})
+
+        with Cache(tmp_path / "cache") as cache:
+            assert cache.get(file_path, "ast") == {"Module": 1}
+            assert cache.get(file_path, "imports") is None
+
+    def test_cache_invalidated_on_change(self, tmp_path, fixt_python_project):
+        file_path = fixt_python_project / "test_file.py"
+
+        with Cache(tmp_path / "cache") as cache:
+            cache.set(file_path, "ast", {"Module": 1})
+            file_path.write_text("import os\n")
+
+            assert cache.get(file_path, "ast") is None
+
+    def test_cache_content_hash_fallback(self, tmp_path, fixt_python_project):
+        file_path = fixt_python_project / "test_file.py"
+
+        with Cache(tmp_path / "cache") as cache:
+            cache.set(file_path, "ast", {"Module": 1})
+            stat = file_path.stat()
+            os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+            assert cache.get(file_path, "ast") == {"Module": 1}
+
+    def test_cache_size_eviction(self, tmp_path, fixt_complex_python_project):
+        file_paths = sorted(fixt_complex_python_project.rglob("*.py"))
+
+        max_size = max(len(str(file_path)) for file_path in file_paths) + len('["os"]')
+
+        with Cache(tmp_path / "cache", max_size=max_size) as cache:
+            for file_path in file_paths:
+                cache.set(file_path, "imports", ["os"])
+
+        with Cache(tmp_path / "cache") as cache:
+            hits = [cache.get(file_path, "imports") for file_path in file_paths]
+
+        assert hits.count(["os"]) == 1
+
+    def test_cache_shared_between_runs(self, tmp_path, fixt_complex_python_project):
+        file_paths = sorted(fixt_complex_python_project.rglob("*.py"))
+
+        with Cache(tmp_path / "cache") as cache:
+            for file_path in file_paths:
+                cache.set(file_path, "imports", ["os"])
+
+        # Reading never holds the database locked, so a second run can write meanwhile.
+        with Cache(tmp_path / "cache") as first, Cache(tmp_path / "cache") as second:
+            assert [first.get(file_path, "imports") for file_path in file_paths] == [["os"]] * 3
+            second.set(file_paths[0], "ast", {"Module": 1})
+            second.flush()
+            assert first.get(file_paths[0], "ast") == {"Module": 1}
+
+    def test_cache_stores_parsed_contents(self, tmp_path, fixt_python_project, monkeypatch):
+        cache_dir = tmp_path / "cache"
+        file_path = fixt_python_project / "test_file.py"
+        file_path.write_text("import os\n")
+        analyze_source = api._analyze_source
+
+        # The file is saved again after it was read, before its results are stored.
+        def save_after_read(source, path, analyses):
+            results = analyze_source(source, path, analyses)
+            file_path.write_text("import sys\n")
+            return results
+
+        monkeypatch.setattr(api, "_analyze_source", save_after_read)
+        assert api._extract_imports([file_path], cache_dir=cache_dir) == {"os"}
+        monkeypatch.undo()
+
+        stat = file_path.stat()
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert api._extract_imports([file_path], cache_dir=cache_dir) == {"sys"}
+
+    def test_describe_with_cache(self, tmp_path, fixt_complex_python_project):
+        cache_dir = tmp_path / "cache"
+
+        expected = api.describe(fixt_complex_python_project, incl_ext=[".py"])
+        first = api.describe(fixt_complex_python_project, incl_ext=[".py"], cache_dir=cache_dir)
+        second = api.describe(fixt_complex_python_project, incl_ext=[".py"], cache_dir=cache_dir)
+
+        assert first == second == expected
+        assert (cache_dir / "cache.sqlite3").exists()
+
+    def test_extract_imports_skips_parse_on_hit(
+        self, tmp_path, fixt_complex_python_project, monkeypatch
+    ):
+        cache_dir = tmp_path / "cache"
+        file_paths = sorted(fixt_complex_python_project.rglob("*.py"))
+        expected = api._extract_imports(file_paths, cache_dir=cache_dir)
+
+        def fail_parse_source(source, path):
+            raise AssertionError(f"Unexpected parse of {path}")
+
+        monkeypatch.setattr(api, "parse_source", fail_parse_source)
+
+        assert api._extract_imports(file_paths, cache_dir=cache_dir) == expected
+
+    def test_describe_with_cache_uses_walk_fingerprints(
+        self, tmp_path, fixt_complex_python_project, monkeypatch
+    ):
+        cache_dir = tmp_path / "cache"
+        cache = MemoryCache()
+        options = {"incl_ext": [".py"], "cache_dir": cache_dir, "cache": cache}
+        expected = api.describe(fixt_complex_python_project, **options)
+
+        # Files were stat'ed while walking the directory: the caches don't stat them again.
+        def fail_stat_fingerprint(path, **kwargs):
+            raise AssertionError(f"Unexpected stat of {path}")
+
+        monkeypatch.setattr("asyntree.cache._stat_fingerprint", fail_stat_fingerprint)
+
+        assert api.describe(fixt_complex_python_project, **options) == expected
+        assert api.describe(fixt_complex_python_project, **options | {"cache": None}) == expected
+
+
+class TestMemoryCache:
+    def test_memory_cache_invalidated_on_change(self, fixt_python_project):
+        file_path = fixt_python_project / "test_file.py"
+        cache = MemoryCache()
+
+        cache.set(file_path, "ast", {"Module": 1})
+        assert cache.get(file_path, "ast") == {"Module": 1}
+
+        file_path.write_text("import os\n")
+        assert cache.get(file_path, "ast") is None
+
+        file_path.unlink()
+        assert cache.get(file_path, "ast") is None
+        assert len(cache) == 0
+
+    def test_memory_cache_in_front_of_disk_cache(
+        self, tmp_path, fixt_complex_python_project, monkeypatch
+    ):
+        cache_dir = tmp_path / "cache"
+        expected = api.describe(fixt_complex_python_project, incl_ext=[".py"], cache_dir=cache_dir)
+
+        def fail_parse_source(source, path):
+            raise AssertionError(f"Unexpected parse of {path}")
+
+        monkeypatch.setattr(api, "parse_source", fail_parse_source)
+
+        # Filled in from the disk cache, then served from memory alone.
+        cache = MemoryCache()
+        options = {"incl_ext": [".py"], "cache": cache}
+        assert api.describe(fixt_complex_python_project, cache_dir=cache_dir, **options) == expected
+        assert len(cache) == 3
+        assert api.describe(fixt_complex_python_project, **options) == expected
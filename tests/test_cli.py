@@ -1,8 +1,9 @@
+import json
 import pathlib
 
 from typer.testing import CliRunner
 
-from asyntree import cli
+from asyntree import api, cli
 
 
 class TestAAA:
@@ -51,6 +52,63 @@ class TestDescribeCommand:
         assert result.exit_code == 1
         assert "Error:" in result.stdout
 
+    def test_describe_jsonl(
+        self, fixt_cli_runner: CliRunner, fixt_complex_python_project: pathlib.Path
+    ) -> None:
+        result = fixt_cli_runner.invoke(
+            cli.app, ["describe", str(fixt_complex_python_project), "--format", "jsonl"]
+        )
+        assert result.exit_code == 0
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert records == api.describe(fixt_complex_python_project, incl_ext=[".py"])
+
+    def test_describe_json(
+        self, fixt_cli_runner: CliRunner, fixt_complex_python_project: pathlib.Path
+    ) -> None:
+        result = fixt_cli_runner.invoke(
+            cli.app, ["describe", str(fixt_complex_python_project), "-f", "json"]
+        )
+        assert result.exit_code == 0
+        assert json.loads(result.stdout) == api.describe(
+            fixt_complex_python_project, incl_ext=[".py"]
+        )
+
+    def test_describe_json_empty(
+        self, fixt_cli_runner: CliRunner, fixt_empty_directory: pathlib.Path
+    ) -> None:
+        result = fixt_cli_runner.invoke(
+            cli.app, ["describe", str(fixt_empty_directory), "-f", "json"]
+        )
+        assert result.exit_code == 0
+        assert json.loads(result.stdout) == []
+
+    def test_describe_unknown_format(
+        self, fixt_cli_runner: CliRunner, fixt_python_project: pathlib.Path
+    ) -> None:
+        result = fixt_cli_runner.invoke(
+            cli.app, ["describe", str(fixt_python_project), "-f", "xml"]
+        )
+        assert result.exit_code == 1
+        assert "Unknown format" in result.stdout
+
+    def test_describe_watch_jsonl(
+        self, fixt_cli_runner: CliRunner, fixt_python_project: pathlib.Path, monkeypatch
+    ) -> None:
+        def watch_describe(directory_path, **kwargs):
+            yield {"results": [{"path": "a.py"}], "changed": [{"path": "a.py"}], "removed": []}
+            yield {"results": [], "changed": [], "removed": ["a.py"]}
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(api, "watch_describe", watch_describe)
+        result = fixt_cli_runner.invoke(
+            cli.app, ["describe", str(fixt_python_project), "--watch", "-f", "jsonl"]
+        )
+        assert result.exit_code == 0
+        assert [json.loads(line) for line in result.stdout.splitlines()] == [
+            {"path": "a.py"},
+            {"path": "a.py", "removed": True},
+        ]
+
 
 class TestToTreeCommand:
     def test_to_tree_directory(
@@ -61,6 +119,32 @@ class TestToTreeCommand:
         assert "test_file.py" in result.stdout
         assert "test_folder" in result.stdout
 
+    def test_to_tree_limits(
+        self, fixt_cli_runner: CliRunner, fixt_complex_python_project: pathlib.Path
+    ) -> None:
+        result = fixt_cli_runner.invoke(
+            cli.app, ["to-tree", str(fixt_complex_python_project), "--max-depth", "1"]
+        )
+        assert result.exit_code == 0
+        assert "utils (2 files" in result.stdout
+        assert "helpers.py" not in result.stdout
+
+        result = fixt_cli_runner.invoke(
+            cli.app, ["to-tree", str(fixt_complex_python_project), "--summarize"]
+        )
+        assert result.exit_code == 0
+        assert "(4 files" in result.stdout
+        assert "main.py" not in result.stdout
+
+    def test_to_tree_plain_when_piped(
+        self, fixt_cli_runner: CliRunner, fixt_complex_python_project: pathlib.Path
+    ) -> None:
+        # The runner's output isn't a terminal, so lines are written without Rich.
+        result = fixt_cli_runner.invoke(cli.app, ["to-tree", str(fixt_complex_python_project)])
+
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == list(api.iter_tree(fixt_complex_python_project))
+
     def test_to_tree_nonexistent_path(self, fixt_cli_runner: CliRunner) -> None:
         result = fixt_cli_runner.invoke(cli.app, ["to-tree", "/path/does/not/exist"])
         assert result.exit_code != 0
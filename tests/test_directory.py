@@ -0,0 +1,108 @@
+import pathlib
+
+import pytest
+
+from asyntree.parser import iter_directory, iter_records, parse_directory
+
+
+@pytest.fixture
+def fixt_nested_project(tmp_path) -> pathlib.Path:
+    project_dir = tmp_path / "nested_project"
+    for relative in [
+        "main.py",
+        "README.md",
+        "pkg/__init__.py",
+        "pkg/core.PY",
+        "pkg/sub/deep.py",
+        ".venv/lib/site.py",
+        "node_modules/dep/index.js",
+        "pkg/.Git/objects/blob.py",
+    ]:
+        file_path = project_dir / relative
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("")
+
+    return project_dir
+
+
+class TestParseDirectory:
+    def test_parse_directory_all_files(self, fixt_nested_project):
+        paths = parse_directory(fixt_nested_project)
+
+        assert len(paths) == 8
+        assert all(isinstance(p, pathlib.Path) and p.is_absolute() for p in paths)
+
+    def test_parse_directory_matches_rglob(self, fixt_nested_project):
+        paths = parse_directory(fixt_nested_project, incl_ext=[".py"], excl_dir=[".venv"])
+        expected = [
+            p
+            for p in fixt_nested_project.rglob("*")
+            if p.is_file() and p.suffix.lower() == ".py" and ".venv" not in p.parts
+        ]
+
+        assert paths == expected
+
+    def test_parse_directory_prunes_excluded(self, fixt_nested_project):
+        paths = parse_directory(fixt_nested_project, excl_dir=[".venv", "NODE_MODULES", ".git"])
+        names = sorted(p.relative_to(fixt_nested_project).as_posix() for p in paths)
+
+        assert names == [
+            "README.md",
+            "main.py",
+            "pkg/__init__.py",
+            "pkg/core.PY",
+            "pkg/sub/deep.py",
+        ]
+
+    def test_parse_directory_excluded_root(self, fixt_nested_project):
+        assert parse_directory(fixt_nested_project / "pkg" / "sub", excl_dir=["pkg"]) == []
+
+    def test_parse_directory_skips_directory_symlinks(self, fixt_nested_project):
+        (fixt_nested_project / "link").symlink_to(
+            fixt_nested_project / "pkg", target_is_directory=True
+        )
+        (fixt_nested_project / "link.py").symlink_to(fixt_nested_project / "main.py")
+
+        paths = parse_directory(fixt_nested_project)
+
+        assert "link.py" in {p.name for p in paths}
+        assert not any("link" in p.parts for p in paths)
+
+    def test_parse_directory_invalid_extension(self, fixt_nested_project):
+        with pytest.raises(ValueError):
+            parse_directory(fixt_nested_project, incl_ext=["py"])
+
+    def test_parse_directory_not_a_directory(self, fixt_nested_project):
+        with pytest.raises(NotADirectoryError):
+            parse_directory(fixt_nested_project / "main.py")
+
+
+class TestIterDirectory:
+    def test_iter_directory_is_lazy(self, fixt_nested_project):
+        paths = iter_directory(fixt_nested_project, incl_ext=[".py"])
+
+        assert not isinstance(paths, list)
+        assert next(paths).suffix.lower() == ".py"
+
+    def test_iter_directory_matches_parse_directory(self, fixt_nested_project):
+        kwargs = {"incl_ext": [".py", ".js"], "excl_dir": [".venv"]}
+
+        assert list(iter_directory(fixt_nested_project, **kwargs)) == parse_directory(
+            fixt_nested_project, **kwargs
+        )
+
+    def test_iter_directory_validates_eagerly(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            iter_directory(tmp_path / "missing")
+
+
+class TestIterRecords:
+    def test_iter_records_matches_stat(self, fixt_nested_project):
+        kwargs = {"incl_ext": [".py"], "excl_dir": [".venv"]}
+        records = list(iter_records(fixt_nested_project, **kwargs))
+
+        assert [record.path for record in records] == parse_directory(fixt_nested_project, **kwargs)
+        for record in records:
+            st = record.path.stat()
+            assert record.fingerprint == (record.size, record.mtime_ns)
+            assert (record.size, record.mtime_ns) == (st.st_size, st.st_mtime_ns)
@@ -0,0 +1,53 @@
+import importlib.metadata
+
+from asyntree import api, distributions
+from asyntree.distributions import build_distribution_index, load_distribution_index
+
+
+class TestDistributionIndex:
+    def test_build_distribution_index(self):
+        index = build_distribution_index()
+
+        assert index["_pytest"] == [("pytest", importlib.metadata.version("pytest"))]
+
+    def test_load_distribution_index_is_persisted(self, tmp_path, monkeypatch):
+        cache_dir = tmp_path / "cache"
+        index = load_distribution_index(cache_dir)
+
+        def fail_build():
+            raise AssertionError("index rebuilt")
+
+        monkeypatch.setattr(distributions, "build_distribution_index", fail_build)
+
+        assert load_distribution_index(cache_dir) == index
+        assert (cache_dir / ".gitignore").exists()
+
+    def test_load_distribution_index_rebuilt_on_install(self, tmp_path, monkeypatch):
+        cache_dir = tmp_path / "cache"
+        site_dir = tmp_path / "site-packages"
+        site_dir.mkdir()
+        monkeypatch.syspath_prepend(str(site_dir))
+        load_distribution_index(cache_dir)
+
+        (site_dir / "example-1.0.dist-info").mkdir()
+        (site_dir / "example-1.0.dist-info" / "METADATA").write_text(
+            "Metadata-Version: 2.1\nName: example-dist\nVersion: 1.0\n"
+        )
+        (site_dir / "example-1.0.dist-info" / "top_level.txt").write_text("example\n")
+
+        assert load_distribution_index(cache_dir)["example"] == [("example-dist", "1.0")]
+
+
+class TestToRequirementsDistributions:
+    def test_to_requirements_distribution_names(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "project"
+        project_dir.mkdir()
+        (project_dir / "main.py").write_text("import _pytest\nimport not_installed\nimport os\n")
+        output_file = fixt_temp_output_dir / "requirements.txt"
+
+        api.to_requirements(project_dir, output_file=str(output_file))
+        assert output_file.read_text() == "not_installed\npytest\n"
+
+        api.to_requirements(project_dir, output_file=str(output_file), pin=True)
+        version = importlib.metadata.version("pytest")
+        assert output_file.read_text() == f"not_installed\npytest=={version}\n"
@@ -0,0 +1,100 @@
+import pathlib
+
+import pytest
+
+from asyntree.gitignore import GitIgnore
+from asyntree.parser import parse_directory
+
+
+@pytest.fixture
+def fixt_gitignore_project(tmp_path) -> pathlib.Path:
+    project_dir = tmp_path / "gitignore_project"
+    for relative in [
+        "main.py",
+        "debug.log",
+        "build/out.py",
+        "src/build/keep.py",
+        "src/cache/data.bin",
+        "logs/important.log",
+        "sub/a.txt",
+        "sub/deeper/a.txt",
+        ".git/HEAD",
+    ]:
+        file_path = project_dir / relative
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("")
+
+    (project_dir / ".gitignore").write_text("*.log\n!logs/important.log\n/build/\ncache/\n")
+    (project_dir / "sub" / ".gitignore").write_text("a.txt\n!/deeper/a.txt\n")
+
+    return project_dir
+
+
+class TestGitIgnore:
+    def test_gitignore_basename_patterns(self):
+        gitignore = GitIgnore(["*.pyc", "# comment", "", "__pycache__/"])
+
+        assert gitignore.match("a.pyc", False) is True
+        assert gitignore.match("pkg/sub/a.pyc", False) is True
+        assert gitignore.match("pkg/__pycache__", True) is True
+        assert gitignore.match("__pycache__", False) is None
+        assert gitignore.match("a.py", False) is None
+
+    def test_gitignore_anchored_patterns(self):
+        gitignore = GitIgnore(["/dist", "docs/*.html"])
+
+        assert gitignore.match("dist", True) is True
+        assert gitignore.match("pkg/dist", True) is None
+        assert gitignore.match("docs/index.html", False) is True
+        assert gitignore.match("docs/api/index.html", False) is None
+
+    def test_gitignore_double_star_patterns(self):
+        gitignore = GitIgnore(["**/foo/bar", "a/**/b", "logs/**"])
+
+        assert gitignore.match("foo/bar", True) is True
+        assert gitignore.match("x/y/foo/bar", True) is True
+        assert gitignore.match("a/b", True) is True
+        assert gitignore.match("a/x/y/b", True) is True
+        assert gitignore.match("logs/2024/01.txt", False) is True
+
+    def test_gitignore_negation_last_match_wins(self):
+        gitignore = GitIgnore(["*.log", "!keep.log", "\\!literal", "\\#literal"])
+
+        assert gitignore.match("debug.log", False) is True
+        assert gitignore.match("keep.log", False) is False
+        assert gitignore.match("!literal", False) is True
+        assert gitignore.match("#literal", False) is True
+
+    def test_gitignore_character_classes(self):
+        gitignore = GitIgnore(["tmp[0-9].txt", "file[!a].txt", "trailing  "])
+
+        assert gitignore.match("tmp1.txt", False) is True
+        assert gitignore.match("tmpx.txt", False) is None
+        assert gitignore.match("fileb.txt", False) is True
+        assert gitignore.match("filea.txt", False) is None
+        assert gitignore.match("trailing", False) is True
+
+
+class TestParseDirectoryGitIgnore:
+    def test_parse_directory_use_gitignore(self, fixt_gitignore_project):
+        paths = parse_directory(fixt_gitignore_project, use_gitignore=True)
+        names = sorted(p.relative_to(fixt_gitignore_project).as_posix() for p in paths)
+
+        assert names == [
+            ".gitignore",
+            "logs/important.log",
+            "main.py",
+            "src/build/keep.py",
+            "sub/.gitignore",
+            "sub/deeper/a.txt",
+        ]
+
+    def test_parse_directory_parent_gitignore(self, fixt_gitignore_project):
+        paths = parse_directory(fixt_gitignore_project / "src", use_gitignore=True)
+
+        assert [p.name for p in paths] == ["keep.py"]
+
+    def test_parse_directory_gitignore_disabled(self, fixt_gitignore_project):
+        paths = parse_directory(fixt_gitignore_project)
+
+        assert len(paths) == 11
@@ -0,0 +1,67 @@
+import os
+import pathlib
+import re
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = pathlib.Path(__file__).parent.parent / "src"
+
+# Generous, so that slow machines don't fail; a regression to eager imports is several times
+# slower than typer alone, which is most of the remaining startup time.
+IMPORT_BUDGET_US = 500_000
+
+HEAVY_MODULES = [
+    "asyntree.cache",
+    "asyntree.distributions",
+    "concurrent.futures.process",
+    "importlib.metadata",
+    "multiprocessing",
+    "rich.table",
+    "rich.tree",
+    "sqlite3",
+]
+
+
+def _import_times(statement: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+class TestImportTime:
+    def test_cli_import_time(self):
+        cumulative = min(_import_times("import asyntree.cli")["asyntree.cli"] for _ in range(3))
+
+        assert cumulative < IMPORT_BUDGET_US
+
+    @pytest.mark.parametrize("module", HEAVY_MODULES)
+    def test_cli_defers_heavy_modules(self, module):
+        assert module not in _import_times("import asyntree.cli")
+
+    def test_package_defers_api(self):
+        times = _import_times("import asyntree")
+
+        assert "asyntree.api" not in times
+        assert "rich" not in times
+
+    def test_package_lazy_attributes(self):
+        import asyntree
+        from asyntree import api
+
+        assert asyntree.to_tree is api.to_tree
+        assert isinstance(asyntree.__version__, str)
+        with pytest.raises(AttributeError):
+            asyntree.missing_attribute
@@ -0,0 +1,156 @@
+import ast
+import pathlib
+
+import pytest
+
+from asyntree import api
+from asyntree.imports import first_party_modules, scan_imports
+from asyntree.visitor import ImportVisitor
+
+SOURCES = {
+    "simple": "import os\nimport sys, json as js\n",
+    "from": "from pathlib import Path\nfrom collections.abc import (\n    Mapping,  # import x\n)\n",
+    "relative": "from . import sibling\nfrom ..pkg import thing\nfrom .mod import name\n",
+    "dotted": "import xml.etree.ElementTree as ET\nfrom os . path import join\n",
+    "nested": (
+        "def load():\n"
+        "    import yaml\n"
+        "    try:\n"
+        "        import ujson as json\n"
+        "    except ImportError:\n"
+        "        import json\n"
+        "\n"
+        "class A:\n"
+        "    from typing import Any\n"
+    ),
+    "continuation": "import os, \\\n    sys\nfrom email \\\n    import message\n",
+    "strings": (
+        '"""Module docstring.\n\nimport notamodule\nfrom fake import x\n"""\n'
+        "x = 'import nope'\n"
+        'y = "from nope import x"  # import commented\n'
+        "z = '''\nimport also_not\n'''\n"
+        "__import__('dynamic')\n"
+        "import real\n"
+    ),
+    "no_imports": "x = 1\n",
+    "crlf": "import os\r\nfrom sys import path\r\n",
+    "first_line": "from __future__ import annotations\n",
+    "semicolon_after": "import os; x = 1\n",
+}
+
+AMBIGUOUS = {
+    "after_semicolon": "x = 1; import os\n",
+    "after_colon": "try: import simplejson as json\nexcept ImportError: json = None\n",
+    "non_ascii_name": "import caf\u00e9\n",
+}
+
+
+class TestScanImports:
+    @pytest.mark.parametrize("name", sorted(SOURCES))
+    def test_scan_imports_matches_import_visitor(self, name):
+        source = SOURCES[name].encode()
+
+        assert scan_imports(source) == ImportVisitor().run(ast.parse(source))
+
+    @pytest.mark.parametrize("name", sorted(AMBIGUOUS))
+    def test_scan_imports_ambiguous(self, name):
+        assert scan_imports(AMBIGUOUS[name].encode()) is None
+
+    def test_to_requirements_falls_back_to_ast(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "project"
+        project_dir.mkdir()
+        (project_dir / "a.py").write_text("import not_installed_a\n")
+        (project_dir / "b.py").write_text("try: import not_installed_b\nexcept ImportError: pass\n")
+        output_file = fixt_temp_output_dir / "requirements.txt"
+
+        api.to_requirements(project_dir, output_file=str(output_file))
+
+        assert output_file.read_text() == "not_installed_a\nnot_installed_b\n"
+
+
+class TestFirstPartyModules:
+    def test_first_party_modules_layouts(self):
+        relative_paths = [
+            # src layout with a nested package
+            "repo/src/app/__init__.py",
+            "repo/src/app/core/__init__.py",
+            "repo/src/app/core/engine.py",
+            # namespace package
+            "repo/libs/ns/plugin/__init__.py",
+            "repo/libs/ns/plugin/hooks.py",
+            # monorepo of src-layout packages and services
+            "repo/packages/alpha/src/alpha/__init__.py",
+            "repo/packages/beta/src/beta/core.py",
+            "repo/services/api/app/__init__.py",
+            # loose scripts and non-Python files
+            "repo/scripts/deploy.py",
+            "repo/README.md",
+        ]
+
+        modules = first_party_modules(pathlib.PurePath(p) for p in relative_paths)
+
+        assert modules == {
+            *("app", "libs", "plugin", "ns", "scripts"),
+            *("alpha", "beta", "services", "api"),
+        }
+
+    def test_first_party_modules_project_package(self):
+        modules = first_party_modules(
+            [pathlib.PurePath("mypkg/__init__.py"), pathlib.PurePath("mypkg/sub/mod.py")]
+        )
+
+        assert modules == {"mypkg"}
+
+    def test_first_party_modules_import_roots_only(self):
+        modules = first_party_modules(
+            pathlib.PurePath(p)
+            for p in [
+                "proj/setup.py",
+                "proj/src/ns/plugin/__init__.py",
+                "proj/examples/django/demo.py",
+                "proj/examples/flask/manage.py",
+                "proj/examples/flask/site/__init__.py",
+            ]
+        )
+
+        assert modules == {"setup", "ns", "plugin", "examples", "site"}
+
+    def test_to_requirements_skips_first_party(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "monorepo"
+        (project_dir / "src" / "app").mkdir(parents=True)
+        (project_dir / "src" / "app" / "__init__.py").write_text("")
+        (project_dir / "src" / "app" / "main.py").write_text(
+            "import app.core\nfrom tools import build\nimport not_installed\n"
+        )
+        (project_dir / "tools").mkdir()
+        (project_dir / "tools" / "build.py").write_text("from app import main\n")
+        output_file = fixt_temp_output_dir / "requirements.txt"
+
+        api.to_requirements(project_dir, output_file=str(output_file))
+
+        assert output_file.read_text() == "not_installed\n"
+
+    def test_to_requirements_keeps_imports_named_like_example_dirs(
+        self, tmp_path, fixt_temp_output_dir
+    ):
+        project_dir = tmp_path / "proj"
+        (project_dir / "examples" / "not_installed").mkdir(parents=True)
+        (project_dir / "examples" / "not_installed" / "demo.py").write_text(
+            "import not_installed\n"
+        )
+        output_file = fixt_temp_output_dir / "requirements.txt"
+
+        api.to_requirements(project_dir, output_file=str(output_file))
+
+        assert output_file.read_text() == "not_installed\n"
+
+    def test_to_requirements_relative_directory(self, tmp_path, fixt_temp_output_dir, monkeypatch):
+        project_dir = tmp_path / "proj"
+        project_dir.mkdir()
+        (project_dir / "main.py").write_text("import not_installed\n")
+        output_file = fixt_temp_output_dir / "requirements.txt"
+        monkeypatch.chdir(tmp_path)
+
+        api.to_requirements(pathlib.Path("proj"), output_file=str(output_file))
+
+        assert output_file.read_text() == "not_installed\n"
@@ -0,0 +1,513 @@
+import io
+import json
+import pathlib
+
+import pytest
+
+from asyntree import api, cli, llm
+from asyntree.llm import SNIFF_SIZE, estimate_tokens, is_binary, prefetch_files, write_llm
+
+
+@pytest.fixture
+def fixt_llm_project(tmp_path) -> pathlib.Path:
+    project_dir = tmp_path / "llm_project"
+    (project_dir / "pkg").mkdir(parents=True)
+
+    (project_dir / "main.py").write_text("print('hello')\n")
+    (project_dir / "pkg" / "crlf.txt").write_bytes(b"first\r\nsecond\r\n")
+    (project_dir / "pkg" / "late_binary.txt").write_bytes(b"valid text " * 10 + b"\xff\xfe")
+
+    return project_dir
+
+
+class TestWriteLLM:
+    def test_write_llm_format(self, fixt_llm_project):
+        out = io.BytesIO()
+        file_paths = [fixt_llm_project / "main.py"]
+
+        write_llm(out, file_paths, [p.relative_to(fixt_llm_project.parent) for p in file_paths])
+
+        assert out.getvalue() == (
+            b"<<<--- File Paths --->>>\n\n"
+            b"llm_project/main.py\n"
+            b"\n<<<--- File Contents --->>>\n\n"
+            b'<file path="llm_project/main.py">\n'
+            b"print('hello')\n"
+            b"\n</file>\n\n"
+        )
+
+    def test_write_llm_chunked_matches_whole(self, fixt_llm_project):
+        file_paths = sorted(p for p in fixt_llm_project.rglob("*") if p.is_file())
+        relative_paths = [p.relative_to(fixt_llm_project.parent) for p in file_paths]
+        whole, chunked = io.BytesIO(), io.BytesIO()
+
+        write_llm(whole, file_paths, relative_paths, chunk_size=None)
+        write_llm(chunked, file_paths, relative_paths, chunk_size=4)
+
+        assert chunked.getvalue() == whole.getvalue()
+        assert b"first\nsecond\n" in whole.getvalue()
+
+    @pytest.mark.parametrize("chunk_size", [None, 1, 2, 3, 5])
+    def test_write_llm_newlines_across_chunks(self, tmp_path, chunk_size):
+        file_path = tmp_path / "newlines.txt"
+        file_path.write_bytes("a\r\nb\rc\r\r\n\u00e9\r".encode())
+        out = io.BytesIO()
+
+        write_llm(out, [file_path], ["newlines.txt"], chunk_size=chunk_size)
+
+        expected = file_path.read_text(encoding="utf-8").encode()
+        assert b'<file path="newlines.txt">\n' + expected + b"\n</file>" in out.getvalue()
+
+    def test_write_llm_discards_partial_block_on_error(self, fixt_llm_project):
+        out = io.BytesIO()
+        file_paths = [fixt_llm_project / "pkg" / "late_binary.txt", fixt_llm_project / "main.py"]
+
+        relative_paths = [p.relative_to(fixt_llm_project.parent) for p in file_paths]
+
+        write_llm(out, file_paths, relative_paths, chunk_size=8)
+
+        content = out.getvalue().decode()
+        assert "valid text" not in content
+        assert 'path="llm_project/pkg/late_binary.txt">\nCould not read file:' in content
+        assert content.endswith("print('hello')\n\n</file>\n\n")
+
+    def test_write_llm_non_ascii_passthrough(self, tmp_path):
+        file_path = tmp_path / "unicode.py"
+        # Multi-byte characters straddle the 1 MiB validation chunks
+        file_path.write_text("caf\u00e9 \u2603\n" * 100_000, encoding="utf-8")
+        out = io.BytesIO()
+
+        write_llm(out, [file_path], ["unicode.py"])
+
+        assert ("caf\u00e9 \u2603\n" * 100_000).encode() in out.getvalue()
+
+    def test_write_llm_error_position_in_file(self, tmp_path):
+        file_path = tmp_path / "invalid.txt"
+        file_path.write_bytes(b"x" * 100_000 + b"\xff")
+        out = io.BytesIO()
+
+        write_llm(out, [file_path], ["invalid.txt"], chunk_size=1000)
+
+        assert b"can't decode byte 0xff in position 100000" in out.getvalue()
+
+
+class TestPrefetch:
+    def test_prefetched_output_matches_sequential(self, fixt_llm_project):
+        (fixt_llm_project / "pkg" / "lone_cr.txt").write_bytes(b"a\rb\r\nc")
+        (fixt_llm_project / "empty.txt").write_bytes(b"")
+        file_paths = sorted(p for p in fixt_llm_project.rglob("*") if p.is_file())
+        relative_paths = [p.relative_to(fixt_llm_project.parent) for p in file_paths]
+        sequential, prefetched = io.BytesIO(), io.BytesIO()
+
+        write_llm(sequential, file_paths, relative_paths)
+        write_llm(prefetched, file_paths, relative_paths, io_threads=4, prefetch_bytes=64)
+
+        assert prefetched.getvalue() == sequential.getvalue()
+        assert b"a\nb\nc" in prefetched.getvalue()
+
+    def test_prefetch_files_bounds_bytes_in_flight(self, tmp_path):
+        file_paths = []
+        for i in range(10):
+            file_path = tmp_path / f"file{i}.txt"
+            file_path.write_bytes(b"x" * 40)
+            file_paths.append(file_path)
+        (tmp_path / "huge.txt").write_bytes(b"x" * 1000)
+        file_paths.insert(5, tmp_path / "huge.txt")
+        sizes = [p.stat().st_size for p in file_paths]
+
+        futures = list(prefetch_files(file_paths, sizes, threads=4, max_bytes=100))
+
+        assert len(futures) == len(file_paths)
+        assert futures[5] is None
+        assert [f.result() for i, f in enumerate(futures) if i != 5] == [b"x" * 40] * 10
+
+    def test_prefetch_files_missing_file(self, tmp_path):
+        file_path = tmp_path / "missing.txt"
+
+        (future,) = prefetch_files([file_path], [0], threads=2)
+
+        with pytest.raises(FileNotFoundError):
+            future.result()
+
+
+class TestToLLM:
+    def test_to_llm_streams_to_output(self, fixt_llm_project, fixt_temp_output_dir):
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        result = api.to_llm(fixt_llm_project, output_file=str(output_file), chunk_size=16)
+
+        assert result == output_file
+        content = output_file.read_text()
+        assert content.startswith("<<<--- File Paths --->>>\n\nllm_project/main.py\n")
+        assert content.count("<file path=") == 3
+
+    def test_to_llm_io_threads(self, fixt_llm_project, fixt_temp_output_dir):
+        sequential = fixt_temp_output_dir / "sequential.txt"
+        prefetched = fixt_temp_output_dir / "prefetched.txt"
+
+        api.to_llm(fixt_llm_project, output_file=str(sequential))
+        api.to_llm(fixt_llm_project, output_file=str(prefetched), io_threads=3)
+
+        assert prefetched.read_bytes() == sequential.read_bytes()
+
+    def test_to_llm_into_the_exported_directory(self, fixt_llm_project):
+        output_file = fixt_llm_project / "llm.txt"
+
+        api.to_llm(fixt_llm_project, output_file=str(output_file))
+        first = output_file.read_bytes()
+        api.to_llm(fixt_llm_project, output_file=str(output_file))
+
+        assert output_file.read_bytes() == first
+        assert b"llm_project/llm.txt" not in first
+
+    @pytest.mark.parametrize("io_threads", [1, 2])
+    def test_write_llm_stops_at_walk_size(self, tmp_path, io_threads):
+        # The file grew after it was found: only the bytes it was found with are copied.
+        file_path = tmp_path / "growing.txt"
+        file_path.write_text("found\nappended\n")
+        out = io.BytesIO()
+
+        write_llm(out, [file_path], ["growing.txt"], sizes=[6], io_threads=io_threads)
+
+        assert out.getvalue().endswith(b'<file path="growing.txt">\nfound\n\n</file>\n\n')
+
+    def test_to_llm_no_files(self, fixt_empty_directory, fixt_temp_output_dir):
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        assert api.to_llm(fixt_empty_directory, output_file=str(output_file)) is None
+        assert not output_file.exists()
+
+
+class TestSkipAndDedupe:
+    def test_is_binary(self):
+        assert is_binary(b"\x89PNG\r\n\x1a\n\x00\x00")
+        assert is_binary(b"valid text \xff\xfe")
+        assert not is_binary(b"")
+        assert not is_binary("caf\u00e9".encode())
+        # A multi-byte character cut off at the end of the sniffed bytes
+        assert not is_binary("caf\u00e9".encode()[:-1])
+
+    @pytest.mark.parametrize("io_threads", [1, 4])
+    def test_skip_binary_and_large(self, fixt_llm_project, io_threads):
+        (fixt_llm_project / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00" * 10)
+        (fixt_llm_project / "huge.py").write_text("x = 1\n" * 100)
+        file_paths = sorted(p for p in fixt_llm_project.rglob("*") if p.is_file())
+        relative_paths = [p.relative_to(fixt_llm_project.parent) for p in file_paths]
+        out = io.BytesIO()
+        report = []
+
+        write_llm(
+            out,
+            file_paths,
+            relative_paths,
+            io_threads=io_threads,
+            skip_binary=True,
+            max_file_size=200,
+            on_file=report.append,
+        )
+
+        content = out.getvalue().decode()
+        assert 'path="llm_project/image.png">\nSkipped: binary file\n</file>' in content
+        assert 'path="llm_project/huge.py">\nSkipped: larger than 200 bytes\n</file>' in content
+        assert "Could not read file" not in content
+        assert {e["path"]: e["status"] for e in report} == {
+            "llm_project/huge.py": "large",
+            "llm_project/image.png": "binary",
+            "llm_project/main.py": "included",
+            "llm_project/pkg/crlf.txt": "included",
+            "llm_project/pkg/late_binary.txt": "binary",
+        }
+
+    def test_prefetch_reads_only_head_of_binary(self, tmp_path, monkeypatch):
+        file_path = tmp_path / "blob.bin"
+        file_path.write_bytes(b"\0" * (1024 * 1024))
+        read_lengths = []
+        read_bytes = llm._read_bytes
+
+        def recording_read_bytes(*args):
+            data = read_bytes(*args)
+            read_lengths.append(len(data))
+            return data
+
+        monkeypatch.setattr(llm, "_read_bytes", recording_read_bytes)
+        out = io.BytesIO()
+
+        write_llm(out, [file_path], ["blob.bin"], io_threads=2, skip_binary=True)
+
+        assert b"Skipped: binary file" in out.getvalue()
+        assert read_lengths and max(read_lengths) <= SNIFF_SIZE
+
+    def test_large_files_are_not_opened(self, fixt_llm_project, monkeypatch):
+        (fixt_llm_project / "huge.py").write_text("x = 1\n" * 100)
+        opened = []
+        real_open = open
+
+        def tracking_open(file, *args, **kwargs):
+            opened.append(pathlib.Path(file).name)
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr("builtins.open", tracking_open)
+
+        write_llm(io.BytesIO(), [fixt_llm_project / "huge.py"], ["huge.py"], max_file_size=200)
+
+        assert opened == []
+
+    @pytest.mark.parametrize("io_threads", [1, 4])
+    def test_dedupe(self, fixt_llm_project, fixt_temp_output_dir, io_threads):
+        (fixt_llm_project / "pkg" / "vendored.py").write_text("print('hello')\n")
+        (fixt_llm_project / "pkg" / "__init__.py").write_text("")
+        (fixt_llm_project / "__init__.py").write_text("")
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        api.to_llm(
+            fixt_llm_project, output_file=str(output_file), dedupe=True, io_threads=io_threads
+        )
+
+        content = output_file.read_text()
+        assert content.count("print('hello')") == 1
+        assert (
+            '<file path="llm_project/pkg/vendored.py">\nDuplicate of llm_project/main.py\n'
+            in content
+        )
+        assert "Duplicate of llm_project/__init__.py" not in content
+
+
+class TestIncremental:
+    def test_incremental_matches_full_export(self, fixt_llm_project, fixt_temp_output_dir):
+        full = fixt_temp_output_dir / "full.txt"
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+        (fixt_llm_project / "main.py").write_text("print('changed')\n")
+        (fixt_llm_project / "pkg" / "crlf.txt").unlink()
+        (fixt_llm_project / "pkg" / "added.py").write_text("import os\n")
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+        api.to_llm(fixt_llm_project, output_file=str(full))
+
+        assert output_file.read_bytes() == full.read_bytes()
+        index = json.loads((fixt_temp_output_dir / "llm.index.json").read_text())
+        assert [entry["path"] for entry in index["files"]] == [
+            "llm_project/main.py",
+            "llm_project/pkg/added.py",
+            "llm_project/pkg/late_binary.txt",
+        ]
+
+    def test_incremental_reads_only_changed_files(
+        self, fixt_llm_project, fixt_temp_output_dir, monkeypatch
+    ):
+        output_file = fixt_temp_output_dir / "llm.txt"
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+        (fixt_llm_project / "pkg" / "added.py").write_text("import os\n")
+        opened = []
+        real_open = open
+
+        def tracking_open(file, *args, **kwargs):
+            opened.append(pathlib.Path(file).name)
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr("builtins.open", tracking_open)
+
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+        files_read = [name for name in opened if name in ("main.py", "crlf.txt", "added.py")]
+        opened.clear()
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+
+        assert files_read == ["added.py"]
+        assert opened == []
+
+    def test_to_llm_uses_walk_fingerprints(
+        self, fixt_llm_project, fixt_temp_output_dir, monkeypatch
+    ):
+        def fail_file_fingerprint(file_path):
+            raise AssertionError(f"Unexpected stat of {file_path}")
+
+        monkeypatch.setattr("asyntree.llm._file_fingerprint", fail_file_fingerprint)
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+        (fixt_llm_project / "main.py").write_text("print('changed')\n")
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+
+        assert "print('changed')" in output_file.read_text()
+
+    def test_incremental_rewrites_modified_export(self, fixt_llm_project, fixt_temp_output_dir):
+        output_file = fixt_temp_output_dir / "llm.txt"
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+        expected = output_file.read_bytes()
+        output_file.write_text("edited by hand")
+
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+
+        assert output_file.read_bytes() == expected
+
+    def test_incremental_rewrites_when_options_change(self, fixt_llm_project, fixt_temp_output_dir):
+        output_file = fixt_temp_output_dir / "llm.txt"
+        api.to_llm(fixt_llm_project, output_file=str(output_file), incremental=True)
+
+        api.to_llm(
+            fixt_llm_project, output_file=str(output_file), incremental=True, skip_binary=True
+        )
+
+        assert "Skipped: binary file" in output_file.read_text()
+
+    def test_incremental_unsupported_options(self, fixt_llm_project):
+        with pytest.raises(ValueError):
+            api.to_llm(fixt_llm_project, shard_size=100, incremental=True)
+        with pytest.raises(ValueError):
+            api.to_llm(fixt_llm_project, dedupe=True, incremental=True)
+
+
+class TestTokenBudget:
+    def test_estimate_tokens(self):
+        assert estimate_tokens(0) == 0
+        assert estimate_tokens(1) == 1
+        assert estimate_tokens(8) == 2
+        assert estimate_tokens(9) == 3
+
+    def test_to_llm_within_budget(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "budget_project"
+        (project_dir / "pkg").mkdir(parents=True)
+        (project_dir / "README.md").write_text("# Project\n")
+        (project_dir / "big.py").write_text("x = 1\n" * 500)
+        (project_dir / "pkg" / "small.py").write_text("y = 2\n")
+        output_file = fixt_temp_output_dir / "llm.txt"
+        report = []
+
+        api.to_llm(project_dir, output_file=str(output_file), max_tokens=200, on_file=report.append)
+
+        content = output_file.read_text()
+        assert estimate_tokens(len(content.encode())) <= 200
+        assert "budget_project/README.md" in content
+        assert "budget_project/pkg/small.py" in content
+        assert "budget_project/big.py" not in content
+        assert {e["path"]: e["status"] for e in report} == {
+            "budget_project/README.md": "included",
+            "budget_project/big.py": "skipped",
+            "budget_project/pkg/small.py": "included",
+        }
+
+    def test_to_llm_skipped_files_are_not_read(self, tmp_path, fixt_temp_output_dir, monkeypatch):
+        project_dir = tmp_path / "budget_project"
+        project_dir.mkdir()
+        (project_dir / "big.py").write_text("x = 1\n" * 500)
+        opened = []
+        real_open = open
+
+        def tracking_open(file, *args, **kwargs):
+            opened.append(str(file))
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr("builtins.open", tracking_open)
+
+        api.to_llm(project_dir, output_file=str(fixt_temp_output_dir / "llm.txt"), max_tokens=50)
+
+        assert not any(path.endswith("big.py") for path in opened)
+
+    def test_cli_to_llm_budget_report(
+        self, fixt_cli_runner, fixt_llm_project, fixt_temp_output_dir
+    ):
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        result = fixt_cli_runner.invoke(
+            cli.app, ["to-llm", str(fixt_llm_project), "-o", str(output_file), "--budget", "1000"]
+        )
+
+        assert result.exit_code == 0
+        assert "llm_project/main.py" in result.stdout
+        assert "included" in result.stdout
+        assert "/ 1000 tokens" in result.stdout
+
+
+class TestSharding:
+    def test_to_llm_shards_with_manifest(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "shard_project"
+        project_dir.mkdir()
+        for i in range(5):
+            (project_dir / f"module{i}.py").write_text(f"value = {i}\n" * 20)
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        result = api.to_llm(project_dir, output_file=str(output_file), shard_size=500)
+
+        assert result == fixt_temp_output_dir / "llm.manifest.json"
+        assert not output_file.exists()
+        manifest = json.loads(result.read_text())
+        assert len(manifest["shards"]) > 1
+        assert [entry["path"] for entry in manifest["files"]] == [
+            f"shard_project/module{i}.py" for i in range(5)
+        ]
+        for entry in manifest["files"]:
+            shard = (fixt_temp_output_dir / entry["shard"]).read_bytes()
+            block = shard[entry["offset"] : entry["offset"] + entry["length"]].decode()
+            assert block.startswith(f'<file path="{entry["path"]}">\n')
+            assert block.endswith("</file>\n\n")
+
+    def test_to_llm_shard_keeps_large_file_whole(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "shard_project"
+        project_dir.mkdir()
+        (project_dir / "big.py").write_text("x = 1\n" * 200)
+        (project_dir / "small.py").write_text("y = 2\n")
+
+        result = api.to_llm(
+            project_dir, output_file=str(fixt_temp_output_dir / "llm.txt"), shard_tokens=50
+        )
+
+        manifest = json.loads(result.read_text())
+        assert manifest["shards"] == ["llm.001.txt", "llm.002.txt"]
+        assert "x = 1\n" * 200 in (fixt_temp_output_dir / "llm.001.txt").read_text()
+
+    def test_to_llm_removes_stale_shards(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "shard_project"
+        project_dir.mkdir()
+        for i in range(5):
+            (project_dir / f"module{i}.py").write_text(f"value = {i}\n" * 20)
+        output_file = fixt_temp_output_dir / "llm.txt"
+
+        api.to_llm(project_dir, output_file=str(output_file), shard_size=500)
+        result = api.to_llm(project_dir, output_file=str(output_file), shard_size=10_000)
+
+        assert json.loads(result.read_text())["shards"] == ["llm.001.txt"]
+        assert sorted(p.name for p in fixt_temp_output_dir.glob("llm.*.txt")) == ["llm.001.txt"]
+
+    def test_to_llm_keeps_files_named_like_shards(self, tmp_path, fixt_temp_output_dir):
+        project_dir = tmp_path / "shard_project"
+        project_dir.mkdir()
+        (project_dir / "main.py").write_text("print('hello')\n")
+        unrelated = fixt_temp_output_dir / "report.2024.txt"
+        unrelated.write_text("not a shard\n")
+
+        api.to_llm(
+            project_dir, output_file=str(fixt_temp_output_dir / "report.txt"), shard_size=10_000
+        )
+
+        assert unrelated.read_text() == "not a shard\n"
+
+    def test_cli_to_llm_budget_report_with_shards(
+        self, fixt_cli_runner, tmp_path, fixt_temp_output_dir
+    ):
+        project_dir = tmp_path / "shard_project"
+        project_dir.mkdir()
+        for i in range(5):
+            (project_dir / f"module{i}.py").write_text(f"value = {i}\n" * 20)
+
+        result = fixt_cli_runner.invoke(
+            cli.app,
+            [
+                "to-llm",
+                str(project_dir),
+                "-o",
+                str(fixt_temp_output_dir / "llm.txt"),
+                "--budget",
+                "10000",
+                "--shard-bytes",
+                "500",
+            ],
+        )
+
+        assert result.exit_code == 0
+        manifest = json.loads((fixt_temp_output_dir / "llm.manifest.json").read_text())
+        used = estimate_tokens(sum(entry["length"] for entry in manifest["files"]))
+        assert f"{used} / 10000 tokens" in result.stdout
+
+    def test_to_llm_shard_size_and_tokens(self, fixt_llm_project):
+        with pytest.raises(ValueError):
+            api.to_llm(fixt_llm_project, shard_size=100, shard_tokens=100)
@@ -0,0 +1,31 @@
+from asyntree import api
+
+
+class TestParallelWorkers:
+    def test_describe_workers_match_serial(self, fixt_complex_python_project):
+        serial = api.describe(fixt_complex_python_project, incl_ext=[".py"])
+        parallel = api.describe(fixt_complex_python_project, incl_ext=[".py"], workers=2)
+
+        assert parallel == serial
+        assert [item["path"] for item in parallel] == [item["path"] for item in serial]
+
+    def test_extract_imports_workers_match_serial(self, fixt_complex_python_project):
+        paths = sorted(fixt_complex_python_project.rglob("*.py"))
+
+        serial = api._extract_imports(paths)
+        parallel = api._extract_imports(paths, workers=2)
+
+        assert parallel == serial
+        assert {"requests", "pandas", "flask", "numpy"} <= parallel
+
+    def test_to_requirements_all_cores(self, fixt_complex_python_project, fixt_temp_output_dir):
+        output_file = fixt_temp_output_dir / "requirements.txt"
+
+        api.to_requirements(
+            fixt_complex_python_project,
+            incl_ext=[".py"],
+            workers=0,
+            output_file=str(output_file),
+        )
+
+        assert output_file.read_text() == "flask\nnumpy\npandas\nrequests\n"
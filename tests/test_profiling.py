@@ -0,0 +1,84 @@
+import json
+
+from typer.testing import CliRunner
+
+import asyntree
+from asyntree import api, cli
+from asyntree.profiling import active_profile
+
+
+class TestProfile:
+    def test_profile_stages(self, fixt_complex_python_project):
+        events = []
+        with asyntree.profile(slowest=2, on_event=events.append) as profile:
+            api.analyze(fixt_complex_python_project, incl_ext=[".py"])
+
+        report = profile.report()
+        stages = report["stages"]
+        n_bytes = sum(p.stat().st_size for p in fixt_complex_python_project.rglob("*.py"))
+
+        assert list(stages) == ["walk", "read", "parse", "visit"]
+        assert all(stage["files"] == 3 for stage in stages.values())
+        assert stages["read"]["bytes"] == stages["parse"]["bytes"] == n_bytes
+        assert len(stages["parse"]["slowest"]) == 2
+        assert stages["parse"]["slowest"][0]["seconds"] >= stages["parse"]["slowest"][1]["seconds"]
+        assert report["elapsed"] >= stages["parse"]["seconds"]
+        assert {event["stage"] for event in events} == set(stages)
+        json.dumps(report)
+
+    def test_profile_export_and_render(self, fixt_complex_python_project, fixt_temp_output_dir):
+        with asyntree.profile() as profile:
+            api.to_llm(
+                fixt_complex_python_project, output_file=str(fixt_temp_output_dir / "llm.txt")
+            )
+            list(api.iter_tree(fixt_complex_python_project))
+
+        stages = profile.report()["stages"]
+        assert stages["export"]["files"] == 4
+        # The blocks of the files, without the header listing their paths.
+        assert 0 < stages["export"]["bytes"] < (fixt_temp_output_dir / "llm.txt").stat().st_size
+        assert "render" in stages
+
+    def test_nothing_recorded_outside_profile(self, fixt_complex_python_project):
+        with asyntree.profile() as outer:
+            with asyntree.profile() as inner:
+                assert active_profile() is inner
+            assert active_profile() is outer
+        assert active_profile() is None
+
+        api.describe(fixt_complex_python_project, incl_ext=[".py"])
+        assert outer.report()["stages"] == {} == inner.report()["stages"]
+
+
+class TestProfileCLI:
+    def test_cli_profile_json(
+        self, fixt_cli_runner: CliRunner, fixt_complex_python_project, tmp_path
+    ):
+        profile_path = tmp_path / "profile.json"
+        result = fixt_cli_runner.invoke(
+            cli.app,
+            [
+                "describe",
+                str(fixt_complex_python_project),
+                "--no-cache",
+                "-f",
+                "json",
+                "--profile-json",
+                str(profile_path),
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert json.loads(result.stdout) == api.describe(
+            fixt_complex_python_project, incl_ext=[".py"]
+        )
+        assert json.loads(profile_path.read_text())["stages"]["parse"]["files"] == 3
+
+    def test_cli_profile_table(self, fixt_cli_runner: CliRunner, fixt_complex_python_project):
+        result = fixt_cli_runner.invoke(
+            cli.app, ["to-tree", str(fixt_complex_python_project), "--profile"]
+        )
+
+        assert result.exit_code == 0
+        assert "render" in result.stderr
+        assert "render" not in result.stdout
@@ -0,0 +1,154 @@
+import pathlib
+import socket
+import tempfile
+import threading
+
+import pytest
+from typer.testing import CliRunner
+
+from asyntree import api, cli
+from asyntree.server import Server, request
+
+
+@pytest.fixture
+def fixt_server():
+    # Socket paths are limited to ~100 bytes, which pytest's tmp_path can exceed.
+    with tempfile.TemporaryDirectory(prefix="asyntree-") as directory:
+        with Server(pathlib.Path(directory) / "server.sock") as server:
+            thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+            thread.start()
+            yield server
+            server.shutdown()
+            thread.join()
+
+
+class TestServer:
+    def test_describe(self, fixt_server, fixt_complex_python_project):
+        result = request(
+            fixt_server.socket_path, "describe", fixt_complex_python_project, {"incl_ext": [".py"]}
+        )
+
+        assert result == api.describe(fixt_complex_python_project, incl_ext=[".py"])
+
+    def test_results_stay_warm(self, fixt_server, fixt_complex_python_project, monkeypatch):
+        parsed = []
+        parse_source = api.parse_source
+        monkeypatch.setattr(
+            api,
+            "parse_source",
+            lambda source, path: parsed.append(path) or parse_source(source, path),
+        )
+        options = {"incl_ext": [".py"]}
+
+        request(fixt_server.socket_path, "describe", fixt_complex_python_project, options)
+        assert len(parsed) == 3
+
+        parsed.clear()
+        (fixt_complex_python_project / "main.py").write_text("import os\n")
+        result = request(fixt_server.socket_path, "describe", fixt_complex_python_project, options)
+
+        assert parsed == [fixt_complex_python_project / "main.py"]
+        assert result == api.describe(fixt_complex_python_project, incl_ext=[".py"])
+
+    def test_to_requirements_and_to_llm(
+        self, fixt_server, fixt_complex_python_project, tmp_path, monkeypatch
+    ):
+        # Output paths are relative to the client's working directory, not the server's.
+        monkeypatch.chdir(tmp_path)
+
+        output = request(
+            fixt_server.socket_path,
+            "to-requirements",
+            fixt_complex_python_project,
+            {"incl_ext": [".py"], "output_file": "requirements.txt"},
+        )
+        assert output == str(tmp_path / "requirements.txt")
+        assert "requests\n" in (tmp_path / "requirements.txt").read_text()
+
+        result = request(
+            fixt_server.socket_path,
+            "to-llm",
+            fixt_complex_python_project,
+            {"incl_ext": [".py"], "output_file": "llm.txt"},
+        )
+        assert result["output"] == str(tmp_path / "llm.txt")
+        assert [entry["status"] for entry in result["files"]] == ["included"] * 3
+
+    def test_to_tree(self, fixt_server, fixt_complex_python_project):
+        result = request(fixt_server.socket_path, "to-tree", fixt_complex_python_project, {})
+
+        assert "helpers.py" in result
+        assert "\x1b[" not in result
+
+    def test_to_tree_plain(self, fixt_server, fixt_complex_python_project):
+        result = request(
+            fixt_server.socket_path, "to-tree", fixt_complex_python_project, {"plain": True}
+        )
+
+        assert result.splitlines() == list(api.iter_tree(fixt_complex_python_project))
+
+    def test_errors(self, fixt_server, tmp_path):
+        with pytest.raises(RuntimeError, match="No such file or directory"):
+            request(fixt_server.socket_path, "describe", tmp_path / "missing", {})
+        with pytest.raises(RuntimeError, match="Unknown command"):
+            request(fixt_server.socket_path, "analyze", tmp_path, {})
+
+        # The server keeps answering after a failed request.
+        assert request(fixt_server.socket_path, "describe", tmp_path, {}) == []
+
+    def test_no_server(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            request(tmp_path / "missing.sock", "describe", tmp_path, {})
+
+    def test_socket_in_use(self, fixt_server):
+        with pytest.raises(FileExistsError, match="already listening"):
+            Server(fixt_server.socket_path)
+
+    def test_stale_socket_replaced(self):
+        with tempfile.TemporaryDirectory(prefix="asyntree-") as directory:
+            socket_path = pathlib.Path(directory) / "server.sock"
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(str(socket_path))
+            stale.close()
+
+            with Server(socket_path):
+                assert socket_path.exists()
+            assert not socket_path.exists()
+
+
+class TestServerCLI:
+    def test_cli_forwards_to_server(
+        self, fixt_cli_runner: CliRunner, fixt_server, fixt_complex_python_project, monkeypatch
+    ) -> None:
+        requests = []
+        monkeypatch.setattr(
+            api, "describe", lambda *args, **kwargs: requests.append(kwargs) or [{"path": "x.py"}]
+        )
+
+        result = fixt_cli_runner.invoke(
+            cli.app,
+            ["describe", str(fixt_complex_python_project), "-f", "jsonl"],
+            env={"ASYNTREE_SOCKET": str(fixt_server.socket_path)},
+        )
+
+        assert result.exit_code == 0
+        assert result.stdout == '{"path": "x.py"}\n'
+        assert requests[0]["cache"] is fixt_server.cache
+
+    def test_cli_runs_locally_without_server(
+        self, fixt_cli_runner: CliRunner, fixt_complex_python_project, tmp_path
+    ) -> None:
+        result = fixt_cli_runner.invoke(
+            cli.app,
+            [
+                "describe",
+                str(fixt_complex_python_project),
+                "-f",
+                "json",
+                "--socket",
+                str(tmp_path / "missing.sock"),
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert "helpers.py" in result.stdout
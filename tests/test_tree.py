@@ -0,0 +1,155 @@
+import io
+import os
+import pathlib
+
+import pytest
+from rich.console import Console
+
+from asyntree import api
+
+
+def _render(tree) -> str:
+    console = Console(file=io.StringIO(), width=1000, color_system=None)
+    console.print(tree)
+    return console.file.getvalue()
+
+
+@pytest.fixture
+def fixt_tree_project(tmp_path) -> pathlib.Path:
+    project_dir = tmp_path / "project"
+    for relative, content in [
+        ("z.py", "x"),
+        ("a-b", "x"),
+        ("a.b/g", "x"),
+        ("b/e.py", "x"),
+        ("b/c/d.py", "xyz"),
+        ("b/.hidden", "x"),
+    ]:
+        file_path = project_dir / relative
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+    return project_dir
+
+
+class TestToTree:
+    def test_to_tree_structure(self, fixt_tree_project):
+        # Entries are ordered by path components, so a directory's files stay together.
+        assert _render(api.to_tree(fixt_tree_project)) == (
+            "project\n"
+            "├── a-b (1 byte)\n"
+            "├── a.b\n"
+            "│   └── g (1 byte)\n"
+            "├── b\n"
+            "│   ├── c\n"
+            "│   │   └── d.py (3 bytes)\n"
+            "│   └── e.py (1 byte)\n"
+            "└── z.py (1 byte)\n"
+        )
+
+    def test_to_tree_skips_directories_of_hidden_files(self, fixt_tree_project):
+        (fixt_tree_project / "keep").mkdir()
+        (fixt_tree_project / "keep" / ".keep").write_text("")
+
+        assert "keep" not in _render(api.to_tree(fixt_tree_project))
+
+    def test_to_tree_sizes_come_from_the_walk(self, fixt_complex_python_project, monkeypatch):
+        stat_calls = []
+        stat = pathlib.Path.stat
+
+        def recording_stat(self, *args, **kwargs):
+            stat_calls.append(self)
+            return stat(self, *args, **kwargs)
+
+        monkeypatch.setattr(pathlib.Path, "stat", recording_stat)
+
+        assert "helpers.py" in _render(api.to_tree(fixt_complex_python_project))
+        assert not [path for path in stat_calls if os.path.isfile(path)]
+
+    def test_to_tree_no_files(self, fixt_empty_directory):
+        assert api.to_tree(fixt_empty_directory) is None
+
+
+class TestTreeLimits:
+    def test_max_depth(self, fixt_tree_project):
+        assert _render(api.to_tree(fixt_tree_project, max_depth=1)) == (
+            "project\n"
+            "├── a-b (1 byte)\n"
+            "├── a.b (1 file, 1 byte)\n"
+            "├── b (2 files, 4 bytes)\n"
+            "└── z.py (1 byte)\n"
+        )
+        assert (
+            _render(api.to_tree(fixt_tree_project, max_depth=0)) == "project (5 files, 7 bytes)\n"
+        )
+
+    def test_max_entries_per_dir(self, fixt_tree_project):
+        assert _render(api.to_tree(fixt_tree_project, max_entries_per_dir=2)) == (
+            "project\n"
+            "├── a-b (1 byte)\n"
+            "├── a.b\n"
+            "│   └── g (1 byte)\n"
+            "└── … 2 more (3 files, 5 bytes)\n"
+        )
+
+    def test_summarize(self, fixt_tree_project):
+        assert _render(api.to_tree(fixt_tree_project, summarize=True)) == (
+            "project (5 files, 7 bytes)\n"
+            "├── a.b (1 file, 1 byte)\n"
+            "└── b (2 files, 4 bytes)\n"
+            "    └── c (1 file, 3 bytes)\n"
+        )
+
+    def test_only_shown_entries_get_nodes(self, tmp_path, monkeypatch):
+        for i in range(50):
+            (tmp_path / f"dir{i:02d}").mkdir()
+            (tmp_path / f"dir{i:02d}" / "file.py").write_text("")
+
+        root = api.to_tree(tmp_path, max_entries_per_dir=3)
+
+        def count_nodes(node):
+            return 1 + sum(count_nodes(child) for child in node.children)
+
+        # The root, three directories with their file, and the collapsed rest.
+        assert len(root.children) == 4
+        assert count_nodes(root) == 8
+
+    def test_invalid_limits(self, fixt_tree_project):
+        with pytest.raises(ValueError, match="max_depth"):
+            api.to_tree(fixt_tree_project, max_depth=-1)
+        with pytest.raises(ValueError, match="max_entries_per_dir"):
+            api.to_tree(fixt_tree_project, max_entries_per_dir=0)
+
+
+class TestIterTree:
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"max_depth": 1}, {"max_entries_per_dir": 2}, {"summarize": True}, {"max_depth": 0}],
+    )
+    def test_iter_tree_matches_rich(self, fixt_tree_project, options):
+        lines = api.iter_tree(fixt_tree_project, **options)
+
+        assert "".join(f"{line}\n" for line in lines) == _render(
+            api.to_tree(fixt_tree_project, **options)
+        )
+
+    def test_iter_tree_ascii(self, fixt_tree_project):
+        assert list(api.iter_tree(fixt_tree_project, max_entries_per_dir=3, ascii=True)) == [
+            "project",
+            "+-- a-b (1 byte)",
+            "+-- a.b",
+            "|   `-- g (1 byte)",
+            "+-- b",
+            "|   +-- c",
+            "|   |   `-- d.py (3 bytes)",
+            "|   `-- e.py (1 byte)",
+            "`-- ... 1 more (1 file, 1 byte)",
+        ]
+
+    def test_iter_tree_does_not_build_rich_nodes(self, fixt_tree_project, monkeypatch):
+        monkeypatch.setattr("rich.text.Text.__init__", None)
+
+        assert len(list(api.iter_tree(fixt_tree_project))) == 9
+
+    def test_iter_tree_no_files(self, fixt_empty_directory):
+        assert list(api.iter_tree(fixt_empty_directory)) == []
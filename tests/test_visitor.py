@@ -1,7 +1,7 @@
 import ast
 from collections import Counter
 
-from asyntree.visitor import ImportVisitor, Visitor
+from asyntree.visitor import ImportVisitor, MultiVisitor, Visitor, count_nodes
 
 
 class TestVisitor:
@@ -77,6 +77,41 @@ def main():
         assert result["IfExp"] == 1
         assert result["Subscript"] == 1
 
+    def test_visitor_preorder_key_order(self):
+        tree = ast.parse("def f(x):\n    return x + 1\n")
+        result = Visitor().run(tree)
+
+        assert list(result) == [
+            "Module",
+            "FunctionDef",
+            "arguments",
+            "arg",
+            "Return",
+            "BinOp",
+            "Name",
+            "Load",
+            "Add",
+            "Constant",
+        ]
+
+    def test_visitor_deeply_nested_tree(self):
+        node = ast.Constant(1)
+        for _ in range(5000):
+            node = ast.UnaryOp(ast.USub(), node)
+        tree = ast.Module([ast.Expr(node)], [])
+
+        result = Visitor().run(tree)
+
+        assert result["UnaryOp"] == 5000
+        assert result["USub"] == 5000
+
+    def test_visitor_visit_matches_run(self):
+        tree = ast.parse("import os\nprint(os.sep)")
+        visitor = Visitor()
+        visitor.visit(tree)
+
+        assert visitor.result() == Visitor().run(tree) == count_nodes(tree)
+
 
 class TestImportVisitor:
     def test_import_visitor_simple_imports(self):
@@ -209,3 +244,36 @@ class MyClass:
 
         assert result1 == {"os"}
         assert result2 == {"sys"}
+
+
+class TestMultiVisitor:
+    def test_multi_visitor_matches_individual_visitors(self):
+        code = """
+import os
+from sys import path
+
+def main():
+    import json
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    return os.getcwd()
+"""
+        tree = ast.parse(code)
+        visitor = MultiVisitor({"ast": Visitor(), "imports": ImportVisitor()})
+
+        result = visitor.run(tree)
+
+        assert result["ast"] == Visitor().run(tree)
+        assert result["imports"] == {"os", "sys", "json", "numpy"}
+
+    def test_multi_visitor_multiple_runs(self):
+        visitor = MultiVisitor({"ast": Visitor(), "imports": ImportVisitor()})
+
+        result1 = visitor.run(ast.parse("import os"))
+        result2 = visitor.run(ast.parse("import sys"))
+
+        assert result1["imports"] == {"os"}
+        assert result2["imports"] == {"sys"}
+        assert result2["ast"] == Counter({"Module": 1, "Import": 1, "alias": 1})
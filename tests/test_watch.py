@@ -0,0 +1,168 @@
+import pathlib
+import shutil
+
+import pytest
+
+from asyntree import api
+from asyntree.llm import is_export_file
+from asyntree.watch import _Inotify, iter_changes
+
+HAS_INOTIFY = _Inotify.open() is not None
+
+MODES = [
+    pytest.param(
+        False, id="inotify", marks=pytest.mark.skipif(not HAS_INOTIFY, reason="no inotify")
+    ),
+    pytest.param(True, id="polling"),
+]
+
+
+@pytest.fixture
+def fixt_watched_project(tmp_path) -> pathlib.Path:
+    project_dir = tmp_path / "watched"
+    (project_dir / "pkg").mkdir(parents=True)
+    (project_dir / "main.py").write_text("import os\n")
+    (project_dir / "pkg" / "__init__.py").write_text("")
+    (project_dir / "pkg" / "util.py").write_text("import requests\n")
+    (project_dir / "empty").mkdir()
+    return project_dir
+
+
+class TestIterChanges:
+    @pytest.mark.parametrize("polling", MODES)
+    def test_iter_changes(self, fixt_watched_project, polling):
+        root = fixt_watched_project.resolve()
+        changes = iter_changes(root, incl_ext=[".py"], polling=polling, interval=0.01)
+
+        first = next(changes)
+        assert first["changed"] == first["files"]
+        assert sorted(p.name for p in first["files"]) == ["__init__.py", "main.py", "util.py"]
+
+        (root / "main.py").write_text("import os\nimport sys\n")
+        assert next(changes)["changed"] == [root / "main.py"]
+
+        # A new file in a directory that had no matching files when the watch started.
+        (root / "empty" / "new.py").write_text("x = 1\n")
+        (root / "empty" / "notes.txt").write_text("ignored\n")
+        update = next(changes)
+        assert update["changed"] == [root / "empty" / "new.py"]
+        assert root / "empty" / "new.py" in update["files"]
+
+        (root / "pkg" / "sub").mkdir()
+        (root / "pkg" / "sub" / "deep.py").write_text("")
+        assert next(changes)["changed"] == [root / "pkg" / "sub" / "deep.py"]
+
+        (root / "main.py").unlink()
+        update = next(changes)
+        assert update["changed"] == []
+        assert update["removed"] == [root / "main.py"]
+
+        shutil.rmtree(root / "pkg")
+        update = next(changes)
+        assert sorted(p.name for p in update["removed"]) == ["__init__.py", "deep.py", "util.py"]
+        assert update["files"] == [root / "empty" / "new.py"]
+
+        changes.close()
+
+    @pytest.mark.parametrize("polling", MODES)
+    def test_iter_changes_ignore(self, fixt_watched_project, polling):
+        root = fixt_watched_project.resolve()
+        output_path = root / "out.txt"
+        changes = iter_changes(root, ignore=output_path.__eq__, polling=polling, interval=0.01)
+
+        assert output_path not in next(changes)["files"]
+
+        output_path.write_text("written by a tool\n")
+        (root / "main.py").write_text("import os\nimport sys\n")
+        update = next(changes)
+        assert update["changed"] == [root / "main.py"]
+        assert output_path not in update["files"]
+
+        changes.close()
+
+
+class TestWatchAPI:
+    def test_watch_describe_parses_changed_files_only(self, fixt_watched_project, monkeypatch):
+        root = fixt_watched_project.resolve()
+        parsed = []
+        parse_source = api.parse_source
+        monkeypatch.setattr(
+            api,
+            "parse_source",
+            lambda source, path: parsed.append(path) or parse_source(source, path),
+        )
+        updates = api.watch_describe(root, incl_ext=[".py"], polling=True, interval=0.01)
+
+        first = next(updates)
+        assert first["results"] == api.describe(root, incl_ext=[".py"])
+        parsed.clear()
+
+        (root / "main.py").write_text("import os\nimport sys\n")
+        update = next(updates)
+        assert parsed == [root / "main.py"]
+        assert update["changed"] == [
+            {"path": "main.py", "ast": {"Module": 1, "Import": 2, "alias": 2}}
+        ]
+        assert update["results"] == api.describe(root, incl_ext=[".py"])
+
+        (root / "pkg" / "util.py").write_text("def broken(:\n")
+        update = next(updates)
+        assert update["changed"][0]["path"] == "util.py"
+        assert "error" in update["changed"][0]
+
+        (root / "pkg" / "util.py").unlink()
+        assert next(updates)["removed"] == ["util.py"]
+
+        updates.close()
+
+    def test_watch_requirements(self, fixt_watched_project, fixt_temp_output_dir):
+        root = fixt_watched_project.resolve()
+        output_file = fixt_temp_output_dir / "requirements.txt"
+        updates = api.watch_requirements(
+            root, incl_ext=[".py"], output_file=str(output_file), polling=True, interval=0.01
+        )
+
+        assert next(updates).read_text() == "requests\n"
+
+        # A file that doesn't parse keeps its imports, and unchanged requirements aren't
+        # written again.
+        (root / "pkg" / "util.py").write_text("import requests\ndef broken(:\n")
+        (root / "main.py").write_text("import os\nimport not_installed\nimport pkg.util\n")
+        assert next(updates).read_text() == "not_installed\nrequests\n"
+
+        (root / "pkg" / "util.py").unlink()
+        assert next(updates).read_text() == "not_installed\n"
+
+        updates.close()
+
+    def test_watch_llm_skips_own_output(self, fixt_watched_project):
+        root = fixt_watched_project.resolve()
+        output_path = root / "llm.txt"
+        updates = api.watch_llm(root, output_file=str(output_path), polling=True, interval=0.01)
+
+        assert next(updates) == output_path
+        assert "llm.txt" not in output_path.read_text()
+        assert (root / "llm.index.json").exists()
+
+        (root / "main.py").write_text("import changed\n")
+        assert next(updates) == output_path
+        content = output_path.read_text()
+        assert "import changed\n" in content
+        assert "llm.index.json" not in content
+
+        updates.close()
+
+    def test_is_export_file(self, tmp_path):
+        output_path = tmp_path / "llm.txt"
+
+        for name in [
+            "llm.txt",
+            ".llm.txt.tmp",
+            "llm.index.json",
+            "llm.manifest.json",
+            "llm.001.txt",
+        ]:
+            assert is_export_file(output_path, tmp_path / name)
+        for name in ["llm.py", "llm.old.txt", "other.txt"]:
+            assert not is_export_file(output_path, tmp_path / name)
+        assert not is_export_file(output_path, tmp_path / "sub" / "llm.txt")